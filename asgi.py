@@ -0,0 +1,8 @@
+"""
+Optional asyncio entry point, served by any ASGI server,
+e.g. uvicorn asgi:app (requires the aiosqlite package)
+"""
+from core.aio import AsyncioApp, create_async_app
+from config import QAConfig as c
+
+app = AsyncioApp(create_async_app(c))
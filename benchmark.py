@@ -0,0 +1,329 @@
+"""
+In-process microbenchmarks
+Usage: python benchmark.py [name ...] (runs every benchmark by default)
+"""
+import sys, time, tempfile, os
+from concurrent.futures import ThreadPoolExecutor
+from sqlalchemy.pool import QueuePool
+from config import Config
+from core.app import create_app, database
+
+class BenchmarkConfig(Config):
+    DEBUG = False
+    SQLALCHEMY_ECHO = False
+    SECRET_KEY = "benchmark"
+    SQLALCHEMY_DATABASE_URI = "sqlite://"
+    DEFAULT_RATELIMIT = ["1000000/minute"]
+
+user_password = "NewPass0123!@#$"
+
+def setup_app(c=BenchmarkConfig):
+    app = create_app(c)
+    with app.app_context():
+        database.create_all()
+    return app
+
+def create_user(client, username):
+    client.post(
+        "/auth/register",
+        json={"username": username, "password": user_password}
+    )
+    response = client.post(
+        "/auth/token",
+        json={"username": username, "password": user_password}
+    )
+    return response.json
+
+def file_config(**options):
+    """
+    Benchmark config backed by a temporary sqlite file,
+    needed whenever several threads share the database
+    """
+    path = os.path.join(tempfile.mkdtemp(), "benchmark.db")
+    options["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{path}"
+    return type("FileBenchmarkConfig", (BenchmarkConfig,), options)
+
+def percentile(samples, p):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * p / 100))]
+
+def timed(f, n):
+    start = time.perf_counter()
+    for _ in range(n):
+        f()
+    return time.perf_counter() - start
+
+def report(name, elapsed, n):
+    print(f"{name:<40} {elapsed * 1e6 / n:>10.1f} us/op {n / elapsed:>12.0f} op/s")
+
+def bench_auth(n=5000):
+    """
+    Per-request overhead of bearer_required with and without
+    the verified-token and user caches
+    """
+    from core.app import token_cache, user_cache
+    from core.decorators import bearer_required
+
+    app = setup_app()
+    tokens = create_user(app.test_client(), "benchmark")
+    protected = bearer_required(lambda user: user)
+    headers = {"Authorization": f"Bearer {tokens['token']}"}
+    for label, size in (("uncached", 0), ("cached", 10000)):
+        for cache in (token_cache, user_cache):
+            cache.maxsize = size
+            cache.clear()
+        with app.test_request_context(headers=headers):
+            protected()
+            elapsed = timed(protected, n)
+            database.session.remove()
+        report(f"auth {label}", elapsed, n)
+
+def bench_login(n=100, threads=16):
+    """
+    Login throughput under concurrent load, and the latency
+    of unrelated GETs served while the logins are running
+    """
+    app = setup_app(file_config(PASSWORD_HASH_WORKERS=4, PASSWORD_HASH_QUEUE=64))
+    create_user(app.test_client(), "benchmark")
+    credentials = {"username": "benchmark", "password": user_password}
+    client = app.test_client()
+
+    def login():
+        response = app.test_client().post("/auth/token", json=credentials)
+        return response.status_code
+
+    reads = list()
+    with ThreadPoolExecutor(threads) as pool:
+        start = time.perf_counter()
+        logins = [pool.submit(login) for _ in range(n)]
+        while not all(f.done() for f in logins):
+            read_start = time.perf_counter()
+            client.get("/todos/best")
+            reads.append(time.perf_counter() - read_start)
+        elapsed = time.perf_counter() - start
+    statuses = [f.result() for f in logins]
+    print(
+        f"login x{n} ({threads} threads, {app.config['PASSWORD_HASH_METHOD']}): "
+        f"{n / elapsed:.1f} logins/s, {statuses.count(503)} rejected"
+    )
+    print(
+        f"concurrent GET latency: p50 {percentile(reads, 50) * 1e3:.1f}ms "
+        f"p99 {percentile(reads, 99) * 1e3:.1f}ms"
+    )
+
+SQLITE_SETTINGS = {
+    "rollback journal": {"SQLITE_PRAGMAS": {}},
+    "wal": {"SQLITE_PRAGMAS": {"journal_mode": "wal"}},
+    "wal + busy_timeout": {
+        "SQLITE_PRAGMAS": {"journal_mode": "wal", "busy_timeout": 5000}
+    },
+    "tuned pragmas": {},
+    "tuned pragmas + pool": {
+        "SQLALCHEMY_ENGINE_OPTIONS": {
+            "poolclass": QueuePool,
+            "pool_size": 8,
+            "max_overflow": 8,
+            "connect_args": {"check_same_thread": False},
+        }
+    },
+}
+
+def bench_sqlite(n=2000, threads=8, write_ratio=0.2):
+    """
+    Mixed read/write throughput for each SQLITE_SETTINGS entry
+    ('tuned' is the SQLITE_PRAGMAS default of the base Config)
+    """
+    writes = int(1 / write_ratio)
+    for label, options in SQLITE_SETTINGS.items():
+        app = setup_app(file_config(PASSWORD_HASH_METHOD="pbkdf2:sha256:1000", **options))
+        tokens = create_user(app.test_client(), "benchmark")
+        headers = {"Authorization": f"Bearer {tokens['token']}"}
+        app.test_client().post("/todos", json={"title": "todo", "public": True}, headers=headers)
+
+        def request(i):
+            client = app.test_client()
+            if i % writes == 0:
+                response = client.post(
+                    "/todos", json={"title": f"todo {i}", "public": True}, headers=headers
+                )
+            elif i % 2:
+                response = client.get("/todos/1", headers=headers)
+            else:
+                response = client.get("/todos?limit=20", headers=headers)
+            return response.status_code
+
+        with ThreadPoolExecutor(threads) as pool:
+            start = time.perf_counter()
+            statuses = list(pool.map(request, range(n)))
+            elapsed = time.perf_counter() - start
+        failed = len([s for s in statuses if s >= 500])
+        report(f"sqlite {label} ({failed} failed)", elapsed, n)
+
+def bench_serialize(n=500, rows=100):
+    """
+    List page of rows todos: ORM instances + get_info + jsonify
+    against column tuples + row_info with each JSON backend
+    """
+    from flask import jsonify
+    from core.app import serializer
+    from core.endpoints import page_response
+    from core.models import Todo
+
+    app = setup_app()
+    client = app.test_client()
+    tokens = create_user(client, "benchmark")
+    headers = {"Authorization": f"Bearer {tokens['token']}"}
+    for i in range(rows):
+        client.post("/todos", json={"title": f"todo {i}", "public": True}, headers=headers)
+
+    def orm_page():
+        database.session.expunge_all()
+        todos = Todo.get_all(0, rows).all()
+        return jsonify([todo.get_info() for todo in todos]).get_data()
+
+    def column_page():
+        database.session.expunge_all()
+        return page_response(Todo.get_all(0, rows), 0, rows, (Todo.id,), Todo).get_data()
+
+    with app.test_request_context():
+        report(f"serialize orm + jsonify ({rows} rows)", timed(orm_page, n), n)
+        for backend in ("json", "orjson"):
+            app.config["JSON_BACKEND"] = backend
+            serializer.init_app(app)
+            report(f"serialize columns + {backend} ({rows} rows)", timed(column_page, n), n)
+        database.session.remove()
+
+def bench_limiter(n=20000):
+    """
+    Per-request cost of the rate limit check for each storage
+    and strategy, on allowed and on rejected requests
+    """
+    from limits import parse
+    from limits.storage import storage_from_string
+    from limits.strategies import STRATEGIES
+
+    path = os.path.join(tempfile.mkdtemp(), "ratelimit.db")
+    settings = (
+        ("memory", "memory://", "fixed-window"),
+        ("sqlite", f"sqlite:///{path}", "fixed-window"),
+        ("sqlite + precheck", f"sqlite:///{path}", "fixed-window-precheck"),
+    )
+    for label, uri, strategy in settings:
+        # strategies only keep a weak reference to their storage
+        storage = storage_from_string(uri)
+        storage.reset()
+        limiter = STRATEGIES[strategy](storage)
+        for outcome, limit in (("allowed", "1000000/minute"), ("rejected", "1/minute")):
+            item = parse(limit)
+            limiter.hit(item, "benchmark")
+            elapsed = timed(lambda: limiter.hit(item, "benchmark"), n)
+            report(f"limiter {label} {outcome}", elapsed, n)
+
+def asgi_call(asgi, method, path, headers=(), body=b""):
+    """
+    Drive one request through an ASGI app, returns the status
+    """
+    path, _, query = path.partition("?")
+    scope = {
+        "type": "http",
+        "http_version": "1.1",
+        "method": method,
+        "path": path,
+        "query_string": query.encode(),
+        "headers": [(b"content-type", b"application/json")] + [
+            (name.lower().encode(), value.encode()) for name, value in headers
+        ],
+        "client": ("127.0.0.1", 0),
+        "server": ("localhost", 80),
+    }
+    messages = [{"type": "http.request", "body": body}]
+    status = list()
+
+    async def receive():
+        return messages.pop(0)
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            status.append(message["status"])
+
+    async def call():
+        await asgi(scope, receive, send)
+        return status[0]
+    return call()
+
+def bench_async(n=2000, concurrency=64, write_ratio=0.1):
+    """
+    p50/p99 latency and throughput of the same mixed workload
+    served by the WSGI app (one thread per request in flight)
+    and by the asyncio entry point (one greenlet per request)
+    """
+    import asyncio, json
+    from core.aio import AsyncioApp, create_async_app
+
+    c = file_config(PASSWORD_HASH_METHOD="pbkdf2:sha256:1000")
+    app = setup_app(c)
+    tokens = create_user(app.test_client(), "benchmark")
+    headers = {"Authorization": f"Bearer {tokens['token']}"}
+    app.test_client().post("/todos", json={"title": "todo", "public": True}, headers=headers)
+    writes = int(1 / write_ratio)
+    workload = [
+        ("POST", "/todos", json.dumps({"title": f"todo {i}", "public": True}).encode())
+        if i % writes == 0 else
+        ("GET", "/todos/1" if i % 2 else "/todos?limit=20", b"")
+        for i in range(n)
+    ]
+
+    def summary(label, latencies, statuses, elapsed):
+        failed = len([s for s in statuses if s >= 500])
+        print(
+            f"{label:<10} p50 {percentile(latencies, 50) * 1e3:>7.2f}ms "
+            f"p99 {percentile(latencies, 99) * 1e3:>7.2f}ms "
+            f"{n / elapsed:>8.0f} req/s ({failed} failed)"
+        )
+
+    def wsgi_request(request):
+        method, path, body = request
+        start = time.perf_counter()
+        response = app.test_client().open(
+            path, method=method, data=body, headers=headers,
+            content_type="application/json"
+        )
+        return time.perf_counter() - start, response.status_code
+
+    with ThreadPoolExecutor(concurrency) as pool:
+        start = time.perf_counter()
+        results = list(pool.map(wsgi_request, workload))
+        elapsed = time.perf_counter() - start
+    summary("wsgi", [r[0] for r in results], [r[1] for r in results], elapsed)
+
+    asgi = AsyncioApp(create_async_app(c))
+
+    async def asgi_workload():
+        slots = asyncio.Semaphore(concurrency)
+
+        async def asgi_request(request):
+            method, path, body = request
+            async with slots:
+                start = time.perf_counter()
+                status = await asgi_call(asgi, method, path, headers.items(), body)
+                return time.perf_counter() - start, status
+
+        start = time.perf_counter()
+        results = await asyncio.gather(*map(asgi_request, workload))
+        return results, time.perf_counter() - start
+
+    results, elapsed = asyncio.run(asgi_workload())
+    summary("asgi", [r[0] for r in results], [r[1] for r in results], elapsed)
+
+BENCHMARKS = {
+    "auth": bench_auth,
+    "login": bench_login,
+    "sqlite": bench_sqlite,
+    "serialize": bench_serialize,
+    "limiter": bench_limiter,
+    "async": bench_async,
+}
+
+if __name__ == "__main__":
+    for name in sys.argv[1:] or BENCHMARKS:
+        BENCHMARKS[name]()
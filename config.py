@@ -1,24 +1,105 @@
+from sqlalchemy.pool import QueuePool
+
+
 class Config(object):
     BASE_URL = "127.0.0.1"
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    USER_CACHE_SIZE = 10000
+    USER_CACHE_TTL = 60
+    TOKEN_CACHE_SIZE = 10000
+    # 'memory' (per worker) or a redis:// url shared by all workers
+    RESPONSE_CACHE_BACKEND = "memory"
+    RESPONSE_CACHE_SIZE = 10000
+    RESPONSE_CACHE_TTL = 30
+    PASSWORD_HASH_METHOD = "pbkdf2:sha256:260000"
+    PASSWORD_HASH_WORKERS = 4
+    PASSWORD_HASH_QUEUE = 32
+    QUERY_STATS_HEADERS = False
+    QUERY_BUDGET_ENFORCE = False
+    # optional read-only bind serving GET requests, e.g. a replica file
+    # or the primary file again (its connections are made query_only)
+    SQLALCHEMY_READ_DATABASE_URI = None
+    # rate limit counters, 'memory://' (per worker), 'sqlite:///<file>'
+    # (shared by the workers of a host) or 'redis://host:port'
+    # (optional 'redis' package, shared by every host)
+    RATELIMIT_STORAGE_URL = "memory://"
+    # fixed window, over-limit keys are then rejected without a storage call
+    RATELIMIT_STRATEGY = "fixed-window-precheck"
+    # DEFAULT_RATELIMIT is the budget of a client (token uid, or address
+    # when anonymous) over every limited route, each request consumes
+    # the cost of its endpoint or else of its method
+    RATELIMIT_COSTS = {
+        "GET": 1,
+        "POST": 5,
+        "PATCH": 5,
+        "DELETE": 5,
+        "auth.create_user": 20,
+        "auth.create_bearer": 20,
+        "auth.refresh_bearer": 5,
+        "users.export_user_data": 20,
+        "todos.import_todos": 50,
+    }
+    # request limits of single endpoints, on top of the budget
+    RATELIMIT_ROUTES = {}
+    # list endpoints encoder, 'json' or 'orjson' (optional package)
+    JSON_BACKEND = "json"
+    PRIMARY_PIN_SIZE = 10000
+    PRIMARY_PIN_TTL = 5
+    # issued on every new connection, see core/sqlite.py
+    SQLITE_PRAGMAS = {
+        "journal_mode": "wal",
+        "synchronous": "normal",
+        "mmap_size": 256 * 1024 * 1024,
+        "cache_size": -64 * 1024,
+        "busy_timeout": 5000,
+        "temp_store": "memory",
+    }
 
 class DevelopmentConfig(Config):
     DEBUG = True
     SQLALCHEMY_ECHO = True
     SECRET_KEY = "REPLACE IT"
     SQLALCHEMY_DATABASE_URI = "sqlite:///dev.db"
+    SQLALCHEMY_ENGINE_OPTIONS = {
+        "poolclass": QueuePool,
+        "pool_size": 5,
+        "max_overflow": 10,
+        "connect_args": {"check_same_thread": False},
+    }
     DEFAULT_RATELIMIT = ["1000/minute"]
+    PASSWORD_HASH_METHOD = "pbkdf2:sha256:10000"
+    QUERY_STATS_HEADERS = True
 
 class QAConfig(Config):
     DEBUG = True
     SQLALCHEMY_ECHO = True
     SECRET_KEY = "REPLACE IT"
     SQLALCHEMY_DATABASE_URI = "sqlite:///qa.db"
+    SQLALCHEMY_ENGINE_OPTIONS = {
+        "poolclass": QueuePool,
+        "pool_size": 5,
+        "max_overflow": 10,
+        "connect_args": {"check_same_thread": False},
+    }
     DEFAULT_RATELIMIT = ["2000/minute"]
+    PASSWORD_HASH_METHOD = "pbkdf2:sha256:10000"
+    QUERY_STATS_HEADERS = True
+    QUERY_BUDGET_ENFORCE = True
 
 class ProductionConfig(Config):
     DEBUG = False
     SQLALCHEMY_ECHO = False
     SECRET_KEY = "REPLACE IT"
     SQLALCHEMY_DATABASE_URI = "sqlite:///main.db"
+    SQLALCHEMY_ENGINE_OPTIONS = {
+        "poolclass": QueuePool,
+        "pool_size": 10,
+        "max_overflow": 20,
+        "connect_args": {"check_same_thread": False},
+    }
     DEFAULT_RATELIMIT = ["100/minute"]
+    RATELIMIT_ROUTES = {
+        "auth.create_user": "10/hour",
+        "auth.create_bearer": "10/minute",
+    }
+    RATELIMIT_STORAGE_URL = "sqlite:///ratelimit.db"
@@ -0,0 +1,160 @@
+import asyncio
+import os
+import sys
+from io import BytesIO
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from sqlalchemy.util import await_only, greenlet_spawn
+from core.app import create_app, password_hasher
+
+
+def async_database_uri(uri, root_path):
+    """
+    Returns the sqlite+aiosqlite equivalent of a sqlite uri,
+    relative paths are resolved like Flask-SQLAlchemy does
+    """
+
+    url = make_url(uri)
+    if url.drivername != "sqlite" or url.database in (None, "", ":memory:"):
+        raise ValueError(f"the asyncio mode needs a sqlite file database, got '{uri}'")
+    return str(url.set(
+        drivername="sqlite+aiosqlite",
+        database=os.path.join(root_path, url.database)
+    ))
+
+def create_async_app(c, pool_size=10, max_overflow=20):
+    """
+    Create the Flask app of c on aiosqlite engines, its requests
+    must run in the greenlets of AsyncioApp
+    """
+
+    # the root path Flask-SQLAlchemy resolves relative sqlite paths from
+    root_path = os.path.dirname(os.path.abspath(__file__))
+    options = {
+        "SQLALCHEMY_DATABASE_URI": async_database_uri(c.SQLALCHEMY_DATABASE_URI, root_path),
+        "SQLALCHEMY_ENGINE_OPTIONS": {
+            "poolclass": AsyncAdaptedQueuePool,
+            "pool_size": pool_size,
+            "max_overflow": max_overflow
+        }
+    }
+    if getattr(c, "SQLALCHEMY_READ_DATABASE_URI", None):
+        options["SQLALCHEMY_READ_DATABASE_URI"] = async_database_uri(
+            c.SQLALCHEMY_READ_DATABASE_URI, root_path
+        )
+    return create_app(type(f"Async{c.__name__}", (c,), options))
+
+def wait_future(future):
+    """
+    Suspend the request greenlet until the concurrent future is done,
+    blocks as usual outside of an event loop thread
+    """
+
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return future.result()
+    return await_only(asyncio.wrap_future(future))
+
+def build_environ(scope, body):
+    """
+    WSGI environ of an ASGI http scope
+    """
+
+    server = scope.get("server") or ("localhost", 80)
+    client = scope.get("client") or ("", 0)
+    environ = {
+        "REQUEST_METHOD": scope["method"],
+        "SCRIPT_NAME": scope.get("root_path", "").encode("utf8").decode("latin1"),
+        "PATH_INFO": scope["path"].encode("utf8").decode("latin1"),
+        "QUERY_STRING": scope["query_string"].decode("latin1"),
+        "SERVER_NAME": server[0],
+        "SERVER_PORT": str(server[1]),
+        "SERVER_PROTOCOL": f"HTTP/{scope['http_version']}",
+        "REMOTE_ADDR": client[0],
+        "REMOTE_PORT": str(client[1]),
+        "wsgi.version": (1, 0),
+        "wsgi.url_scheme": scope.get("scheme", "http"),
+        "wsgi.input": BytesIO(body),
+        "wsgi.errors": sys.stderr,
+        "wsgi.multithread": False,
+        "wsgi.multiprocess": True,
+        "wsgi.run_once": False,
+    }
+    for name, value in scope["headers"]:
+        name = name.decode("latin1").upper().replace("-", "_")
+        value = value.decode("latin1")
+        if name not in ("CONTENT_TYPE", "CONTENT_LENGTH"):
+            name = f"HTTP_{name}"
+        if name in environ:
+            value = f"{environ[name]},{value}"
+        environ[name] = value
+    # the body is read in full, chunked requests included
+    environ["CONTENT_LENGTH"] = str(len(body))
+    return environ
+
+
+class AsyncioApp:
+    """
+    ASGI application serving a Flask app created by create_async_app
+    Each request runs in its own greenlet, database I/O (aiosqlite)
+    and password hashing (executor) suspend it instead of blocking,
+    so concurrency is not capped by a thread count
+    """
+
+    def __init__(self, app) -> None:
+        self.app = app
+        password_hasher.wait = wait_future
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            return await self.lifespan(receive, send)
+        body = list()
+        while True:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                return
+            body.append(message.get("body", b""))
+            if not message.get("more_body"):
+                break
+        environ = build_environ(scope, b"".join(body))
+        await greenlet_spawn(self.handle, environ, send)
+
+    def handle(self, environ, send):
+        start = dict()
+
+        def start_response(status, headers, exc_info=None):
+            start["status"] = int(status.split(" ", 1)[0])
+            start["headers"] = [
+                (name.lower().encode("latin1"), value.encode("latin1"))
+                for name, value in headers
+            ]
+
+        def send_start():
+            await_only(send({"type": "http.response.start", **start}))
+            start["sent"] = True
+
+        app_iter = self.app.wsgi_app(environ, start_response)
+        try:
+            for chunk in app_iter:
+                if "sent" not in start:
+                    send_start()
+                if chunk:
+                    await_only(send({
+                        "type": "http.response.body", "body": chunk, "more_body": True
+                    }))
+            if "sent" not in start:
+                send_start()
+            await_only(send({"type": "http.response.body", "body": b""}))
+        finally:
+            if hasattr(app_iter, "close"):
+                app_iter.close()
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await send({"type": "lifespan.shutdown.complete"})
+                return
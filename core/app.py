@@ -1,15 +1,26 @@
 from flask import Flask
 from flask_migrate import Migrate
-from flask_sqlalchemy import SQLAlchemy
 from flask_limiter import Limiter
-from flask_limiter.util import get_remote_address
 from core.logger import Log
+from core.cache import TTLCache, ResponseCache
+from core.hashing import PasswordHasher
+from core.metrics import Metrics
+from core.routing import RoutingSQLAlchemy
+from core.serializer import JSONSerializer
+# registers the sqlite limiter storage and the precheck strategy
+from core import ratelimit
 
 
-database = SQLAlchemy()
+database = RoutingSQLAlchemy()
 migrate = Migrate()
 error_log = Log("error.log")
-limiter = Limiter(key_func=get_remote_address)
+limiter = Limiter(key_func=ratelimit.client_key)
+user_cache = TTLCache()
+token_cache = TTLCache()
+response_cache = ResponseCache()
+password_hasher = PasswordHasher()
+metrics = Metrics()
+serializer = JSONSerializer()
 
 
 def create_app(c) -> Flask:
@@ -17,27 +28,37 @@ def create_app(c) -> Flask:
     Create Flask app
     """
     from .exceptions import exceptions_handler
+    from . import instrumentation, sqlite
 
     app = Flask(__name__)
     app.config.from_object(c)
     database.init_app(app)
+    sqlite.init_app(app)
     migrate.init_app(app, database)
     limiter.init_app(app)
+    user_cache.init_app(app, "USER_CACHE")
+    token_cache.init_app(app, "TOKEN_CACHE")
+    response_cache.init_app(app)
+    password_hasher.init_app(app)
+    serializer.init_app(app)
+    error_log.init_app(app)
+    instrumentation.init_app(app)
     
     from .endpoints import auth
     from .endpoints import users
     from .endpoints import todos
     from .endpoints import reviews
+    from .endpoints import monitoring
+
+    from .commands import check_query_plans
+
+    app.cli.add_command(check_query_plans)
 
     app.register_error_handler(Exception, exceptions_handler)
     app.register_blueprint(auth, url_prefix='/auth')
     app.register_blueprint(users, url_prefix='/users')
     app.register_blueprint(todos, url_prefix='/todos')
     app.register_blueprint(reviews, url_prefix='/reviews')
+    app.register_blueprint(monitoring, url_prefix='/metrics')
 
-    limiter.limit(c.DEFAULT_RATELIMIT)(auth)
-    limiter.limit(c.DEFAULT_RATELIMIT)(users)
-    limiter.limit(c.DEFAULT_RATELIMIT)(todos)
-    limiter.limit(c.DEFAULT_RATELIMIT)(reviews)
-
-    return app
\ No newline at end of file
+    return app
@@ -0,0 +1,262 @@
+import json
+from collections import OrderedDict
+from functools import wraps
+from threading import Lock
+from time import monotonic, time_ns
+from urllib.parse import urlencode
+from flask import current_app, request
+from flask.wrappers import Response
+
+
+class TTLCache:
+    """
+    Bounded, thread-safe LRU cache with per-entry expiry
+    """
+
+    def __init__(self, maxsize=1024, ttl=60) -> None:
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = Lock()
+
+    def init_app(self, app, prefix):
+        """
+        Read <prefix>_SIZE and <prefix>_TTL from the app config
+        """
+
+        self.maxsize = app.config.get(f"{prefix}_SIZE", self.maxsize)
+        self.ttl = app.config.get(f"{prefix}_TTL", self.ttl)
+        self.clear()
+
+    def get(self, key):
+        """
+        Returns the cached value or None if missing or expired
+        """
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            value, expires = entry
+            if expires <= monotonic():
+                del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value, ttl=None):
+        """
+        Cache a value for ttl seconds (defaults to the cache ttl),
+        evicting the least recently used entry when full
+        """
+
+        if ttl is None:
+            ttl = self.ttl
+        if ttl <= 0 or self.maxsize <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (value, monotonic() + ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key):
+        """
+        Invalidate a single entry
+        """
+
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        """
+        Invalidate all entries
+        """
+
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """
+        Returns hit, miss and eviction counters
+        """
+
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "size": len(self._entries),
+            "maxsize": self.maxsize
+        }
+
+
+class MemoryBackend:
+    """
+    In-process response cache backend
+    """
+
+    def __init__(self, maxsize, ttl) -> None:
+        self.entries = TTLCache(maxsize, ttl)
+        self.versions = TTLCache(maxsize, float("inf"))
+
+    def get(self, key):
+        return self.entries.get(key)
+
+    def set(self, key, value, ttl):
+        self.entries.set(key, value, ttl)
+
+    def get_versions(self, namespaces):
+        versions = list()
+        for namespace in namespaces:
+            version = self.versions.get(namespace)
+            if version is None:
+                version = self.bump(namespace)
+            versions.append(version)
+        return versions
+
+    def bump(self, namespace):
+        version = str(time_ns())
+        self.versions.set(namespace, version)
+        return version
+
+    def stats(self):
+        return self.entries.stats()
+
+
+class RedisBackend:
+    """
+    Response cache backend shared by every worker through redis
+    (requires the optional 'redis' package)
+    """
+
+    def __init__(self, url, ttl) -> None:
+        import redis
+
+        self.client = redis.Redis.from_url(url)
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        value = self.client.get("response:" + key)
+        if value is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return json.loads(value)
+
+    def set(self, key, value, ttl):
+        self.client.set("response:" + key, json.dumps(value), ex=ttl)
+
+    def get_versions(self, namespaces):
+        keys = ["version:" + n for n in namespaces]
+        versions = self.client.mget(keys)
+        for i, version in enumerate(versions):
+            if version is None:
+                version = str(time_ns())
+                self.client.set(keys[i], version, nx=True)
+                version = self.client.get(keys[i])
+            versions[i] = version.decode() if isinstance(version, bytes) else version
+        return versions
+
+    def bump(self, namespace):
+        version = str(time_ns())
+        self.client.set("version:" + namespace, version)
+        return version
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses}
+
+
+class ResponseCache:
+    """
+    Caches the responses of anonymous GET endpoints,
+    entries are keyed by route, arguments and the versions of
+    the namespaces they depend on, writes bump those versions
+    """
+
+    def __init__(self) -> None:
+        self.backend = None
+        self.ttl = 0
+
+    def init_app(self, app):
+        """
+        RESPONSE_CACHE_BACKEND is either 'memory' or a redis:// url,
+        a RESPONSE_CACHE_TTL of 0 disables the cache
+        """
+
+        self.ttl = app.config.get("RESPONSE_CACHE_TTL", 0)
+        backend = app.config.get("RESPONSE_CACHE_BACKEND", "memory")
+        if backend == "memory":
+            self.backend = MemoryBackend(
+                app.config.get("RESPONSE_CACHE_SIZE", 1024), self.ttl
+            )
+        elif backend.startswith(("redis://", "rediss://", "unix://")):
+            self.backend = RedisBackend(backend, self.ttl)
+        else:
+            raise ValueError(f"unknown response cache backend '{backend}'")
+
+    def cached(self, *namespaces):
+        """
+        Cache successful anonymous responses of the decorated view,
+        namespaces are formatted with the view arguments,
+        e.g. "todo:{todo_id}"
+        Must be applied under bearer_optional
+        """
+
+        def decorator(f):
+            @wraps(f)
+            def decorated(current_user, *args, **kwargs):
+                if current_user is not None or self.ttl <= 0:
+                    return f(current_user, *args, **kwargs)
+                scopes = ["*"] + [n.format(**kwargs) for n in namespaces]
+                key = "|".join(
+                    [request.path, urlencode(sorted(request.args.items(multi=True)))]
+                    + self.backend.get_versions(scopes)
+                )
+                entry = self.backend.get(key)
+                if entry is not None:
+                    response = Response(
+                        entry["body"],
+                        status=entry["status"],
+                        headers=entry["headers"]
+                    )
+                    response.headers["X-Cache"] = "HIT"
+                    return response
+                response = current_app.make_response(
+                    f(current_user, *args, **kwargs)
+                )
+                if response.status_code == 200 and not response.is_streamed:
+                    self.backend.set(key, {
+                        "body": response.get_data(as_text=True),
+                        "status": response.status_code,
+                        "headers": [
+                            [k, v] for k, v in response.headers
+                            if k != "Content-Length"
+                        ]
+                    }, self.ttl)
+                response.headers["X-Cache"] = "MISS"
+                return response
+            return decorated
+        return decorator
+
+    def invalidate(self, *namespaces):
+        """
+        Drop every entry depending on the given namespaces,
+        "*" drops every entry
+        """
+
+        if self.ttl <= 0:
+            return
+        for namespace in namespaces:
+            self.backend.bump(namespace)
+
+    def stats(self):
+        return self.backend.stats() if self.backend else dict()
@@ -0,0 +1,163 @@
+import re
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import event
+from core.app import database as db
+from .models import (
+    User,
+    Todo,
+    Item,
+    Review
+)
+
+
+# matches SQLite plan steps that walk a whole table without an index
+FULL_SCAN_REGEX = re.compile(r"^SCAN (TABLE )?\w+( AS \w+)?$")
+# matches SQLite plan steps that sort the rows instead of reading them in order
+TEMP_SORT_REGEX = re.compile(r"^USE TEMP B-TREE FOR ")
+
+# ordered by a relevance score, only the matching rows are sorted
+RANKED_CHECKS = {
+    "Todo.search",
+    "Todo.search(public)",
+    "Review.search",
+    "Review.search(public)",
+}
+
+
+def plan_problems(statement, steps, ranked=False):
+    """
+    Steps of a statement plan whose cost grows with the table:
+    full table scans, and sorts of paged statements (pages must be
+    read in index order, ranked ones excepted)
+    A scan read in ORDER BY order under a LIMIT stops at the page
+    """
+
+    paged = "ORDER BY" in statement and "LIMIT" in statement
+    sorts = [step for step in steps if TEMP_SORT_REGEX.match(step)]
+    if paged and not sorts:
+        return []
+    problems = [step for step in steps if FULL_SCAN_REGEX.match(step)]
+    if paged and not ranked:
+        problems.extend(sorts)
+    return problems
+
+
+def query_plan_checks(user, todo, item, review):
+    """
+    Every model query method used by the endpoints,
+    each called with a legacy offset and with a cursor where it pages
+    """
+
+    return {
+        "User.get_by_id": lambda: User.get_by_id(user.id),
+        "User.get_by_username": lambda: User.get_by_username(user.username),
+        "User.get_todo_by_id": lambda: user.get_todo_by_id(todo.id),
+        "User.get_todos": lambda: user.get_todos(10, 10).all(),
+        "User.get_todos(cursor)": lambda: user.get_todos(cursor=(todo.id,)).all(),
+        "User.get_private_todos": lambda: user.get_private_todos(10, 10).all(),
+        "User.get_public_todos": lambda: user.get_public_todos(10, 10).all(),
+        "User.get_reviews": lambda: user.get_reviews(10, 10).all(),
+        "User.get_reviews(cursor)": lambda: user.get_reviews(cursor=(review.id,)).all(),
+        "User.get_review_by_id": lambda: user.get_review_by_id(review.id),
+        "User.get_review_by_todo": lambda: user.get_review_by_todo(todo),
+        "User.get_single_public_review": lambda: user.get_single_public_review(review.id),
+        "Todo.best": lambda: Todo.best(10, 10).all(),
+        "Todo.best(cursor)": lambda: Todo.best(cursor=(3.0, todo.id)).all(),
+        "Todo.get_all_public_or_by_user": lambda: Todo.get_all_public_or_by_user(user, 10, 10).all(),
+        "Todo.get_all_public_or_by_user(cursor)": lambda: Todo.get_all_public_or_by_user(user, 0, 10, (todo.id,)).all(),
+        "Todo.get_single_public_or_by_user": lambda: Todo.get_single_public_or_by_user(user, todo.id),
+        "Todo.get_single_public": lambda: Todo.get_single_public(todo.id),
+        "Todo.get_all_public": lambda: Todo.get_all_public(10, 10).all(),
+        "Todo.get_all_public(cursor)": lambda: Todo.get_all_public(cursor=(todo.id,)).all(),
+        "Todo.get_all_private": lambda: Todo.get_all_private(10, 10).all(),
+        "Todo.get_by_id": lambda: Todo.get_by_id(todo.id),
+        "Todo.get_items": lambda: todo.get_items(10, 10).all(),
+        "Todo.get_items(cursor)": lambda: todo.get_items(cursor=(item.id,)).all(),
+        "Todo.get_item_by_id": lambda: todo.get_item_by_id(item.id),
+        "Todo.get_reviews": lambda: todo.get_reviews(10, 10).all(),
+        "Todo.get_reviews(cursor)": lambda: todo.get_reviews(cursor=(review.id,)).all(),
+        "Todo.get_review_by_user": lambda: todo.get_review_by_user(user),
+        "Item.get_by_id": lambda: Item.get_by_id(item.id),
+        "Review.get_by_id": lambda: Review.get_by_id(review.id),
+        "Review.get_all_public": lambda: Review.get_all_public(10, 10).all(),
+        "Review.get_all_public(cursor)": lambda: Review.get_all_public(0, 10, (review.id,)).all(),
+        "Review.get_all_public_or_by_user": lambda: Review.get_all_public_or_by_user(user, 10, 10).all(),
+        "Review.get_all_public_or_by_user(cursor)": lambda: Review.get_all_public_or_by_user(user, 0, 10, (review.id,)).all(),
+        "Review.get_single_public": lambda: Review.get_single_public(review.id),
+        "Review.get_single_public_or_by_user": lambda: Review.get_single_public_or_by_user(review.id, user),
+        "Todo.search": lambda: Todo.search("query plan", user, 10, 10).all(),
+        "Todo.search(public)": lambda: Todo.search("query plan", None, 10, 10).all(),
+        "Review.search": lambda: Review.search("query plan", user, 10, 10).all(),
+        "Review.search(public)": lambda: Review.search("query plan", None, 10, 10).all(),
+    }
+
+def explain_query_plans():
+    """
+    Run every query method against throwaway rows and return
+    {method: [(sql, [full scan steps])]} using EXPLAIN QUERY PLAN
+    """
+
+    user = User(username="__query_plan__")
+    db.session.add(user)
+    db.session.flush()
+    todo = Todo(user_id=user.id, title="__query_plan__", public=True)
+    db.session.add(todo)
+    db.session.flush()
+    item = Item(todo_id=todo.id, content="__query_plan__")
+    review = Review(user_id=user.id, todo_id=todo.id, stars=3)
+    db.session.add_all([item, review])
+    db.session.flush()
+
+    connection = db.session.connection()
+    statements = list()
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        statements.append((statement, parameters))
+
+    plans = dict()
+    event.listen(connection, "before_cursor_execute", capture)
+    try:
+        for name, call in query_plan_checks(user, todo, item, review).items():
+            statements.clear()
+            call()
+            plans[name] = list(statements)
+    finally:
+        event.remove(connection, "before_cursor_execute", capture)
+
+    result = dict()
+    for name, executed in plans.items():
+        result[name] = list()
+        for statement, parameters in executed:
+            steps = connection.exec_driver_sql(
+                "EXPLAIN QUERY PLAN " + statement, parameters
+            ).fetchall()
+            scans = plan_problems(
+                statement, [s[-1] for s in steps], name in RANKED_CHECKS
+            )
+            result[name].append((statement, scans))
+    db.session.rollback()
+    return result
+
+
+@click.command("check-query-plans")
+@click.option("--verbose", is_flag=True, help="Print every checked statement")
+@with_appcontext
+def check_query_plans(verbose):
+    """
+    Fail if any model query method does a full table scan
+    or sorts the rows of a page
+    """
+
+    failed = False
+    for name, statements in explain_query_plans().items():
+        for statement, scans in statements:
+            if scans:
+                failed = True
+                click.echo(f"FAIL {name}: {', '.join(scans)}")
+                click.echo(f"     {' '.join(statement.split())}")
+            elif verbose:
+                click.echo(f"ok   {name}")
+    if failed:
+        raise SystemExit(1)
+    click.echo("no full table scans or sorted pages")
@@ -1,5 +1,6 @@
-from flask import request, current_app
+from flask import request, current_app, g
 from functools import wraps
+from time import time
 import jwt
 from jwt.exceptions import PyJWTError
 from pydantic.error_wrappers import ValidationError
@@ -8,11 +9,15 @@ from werkzeug.exceptions import (
     Unauthorized
 )
 from .schemas import (
+    ExpandSchema,
+    SearchSchema,
     PaginationSchema,
+    StreamPaginationSchema,
     errors_to_response,
     BearerSchema
 )
 from .models import User
+from core.app import token_cache
 
 
 def decorator_boilerplate(f):
@@ -44,22 +49,15 @@ def json_required(f):
         return f(data, *args, **kwargs)
     return decorated
 
-def bearer_required(f) -> User:
+def decode_bearer(auth_header) -> dict:
     """
-    1. Verifies request header contains authorization token (type 'access')
-    2. Decodes the bearer and returns the relevant user
+    Validates and decodes an authorization header,
+    repeated tokens are served from the verified-token cache
     """
-    @wraps(f)
-    def decorated(*args, **kwargs):
-        try:
-            assert "Authorization" in request.headers
-        except AssertionError:
-            raise Unauthorized(description="could not authenticate")
-        auth_header = {
-            "Authorization": request.headers["Authorization"]
-        }
+    decoded = token_cache.get(auth_header)
+    if decoded is None:
         try:
-            token = BearerSchema(**auth_header)
+            token = BearerSchema(Authorization=auth_header)
         except ValidationError:
             raise Unauthorized(description="could not authenticate")
         try:
@@ -70,14 +68,38 @@ def bearer_required(f) -> User:
             )
         except PyJWTError:
             raise Unauthorized(description="could not authenticate")
+        if "exp" in decoded:
+            token_cache.set(auth_header, decoded, decoded["exp"] - time())
+    return decoded
+
+def authenticate(scope) -> User:
+    """
+    1. Decodes the authorization header (see decode_bearer)
+    2. Verifies the token scope and returns the relevant user
+    """
+    decoded = decode_bearer(request.headers["Authorization"])
+    try:
+        assert decoded["scp"] == scope
+    except AssertionError:
+        raise Unauthorized(description="could not authenticate")
+    g.user_id = decoded["uid"]
+    user = User.get_cached(decoded["uid"])
+    if not user:
+        raise Unauthorized(description="could not authenticate")
+    return user
+
+def bearer_required(f) -> User:
+    """
+    1. Verifies request header contains authorization token (type 'access')
+    2. Decodes the bearer and returns the relevant user
+    """
+    @wraps(f)
+    def decorated(*args, **kwargs):
         try:
-            assert decoded["scp"] == "access"
+            assert "Authorization" in request.headers
         except AssertionError:
             raise Unauthorized(description="could not authenticate")
-        user = User.get_by_id(decoded["uid"])
-        if not user:
-            raise Unauthorized(description="could not authenticate")
-        
+        user = authenticate("access")
         return f(user, *args, **kwargs)
     return decorated
 
@@ -93,28 +115,7 @@ def bearer_optional(f) -> User|None:
         if "Authorization" not in request.headers:
             return f(None, *args, **kwargs)
         # bearer authorization 
-        auth_header = {
-            "Authorization": request.headers["Authorization"]
-        }
-        try:
-            token = BearerSchema(**auth_header)
-        except ValidationError:
-            raise Unauthorized(description="could not authenticate")
-        try:
-            decoded = jwt.decode(
-                jwt=token.Authorization[7:],
-                key=current_app.secret_key,
-                algorithms=["HS256"]
-            )
-        except PyJWTError:
-            raise Unauthorized(description="could not authenticate")
-        try:
-            assert decoded["scp"] == "access"
-        except AssertionError:
-            raise Unauthorized(description="could not authenticate")
-        user = User.get_by_id(decoded["uid"])
-        if not user:
-            raise Unauthorized(description="could not authenticate")
+        user = authenticate("access")
         return f(user, *args, **kwargs)
     return decorated
 
@@ -129,50 +130,76 @@ def refresh_required(f):
             assert "Authorization" in request.headers
         except AssertionError:
             raise Unauthorized(description="could not authenticate")
-        auth_header = {
-            "Authorization": request.headers["Authorization"]
-        }
-        try:
-            token = BearerSchema(**auth_header)
-        except ValidationError:
-            raise Unauthorized(description="could not authenticate")
-        try:
-            decoded = jwt.decode(
-                jwt=token.Authorization[7:],
-                key=current_app.secret_key,
-                algorithms=["HS256"]
-            )
-        except PyJWTError:
-            raise Unauthorized(description="could not authenticate")
-        try:
-            assert decoded["scp"] == "refresh"
-        except AssertionError:
-            raise Unauthorized(description="could not authenticate")
-        user = User.get_by_id(decoded["uid"])
-        if not user:
-            raise Unauthorized(description="could not authenticate")
+        user = authenticate("refresh")
         return f(user, *args, **kwargs)
     return decorated
 
-def pagination_required(f):
+def pagination_required(cursor_keys=1):
     """ 
     Verifies request params contain a valid offset and a limit
     In case those are missing, offset defaults to 0 and limit defaults to 100
+    An opaque cursor (see X-Next-Cursor) takes precedence over the legacy offset,
+    it must hold as many keys as the view sorts on (cursor_keys)
+    With stream=true the page is streamed and limit may go up to 5000
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated(*args, **kwargs):
+            offset = request.args.get('offset')
+            limit = request.args.get('limit')
+            cursor = request.args.get('cursor')
+            g.stream = request.args.get('stream', '').lower() in ("1", "true")
+            if not offset:
+                offset = 0
+            if not limit:
+                limit = 100
+            if not cursor:
+                cursor = None
+            schema = StreamPaginationSchema if g.stream else PaginationSchema
+            try:
+                data = schema(**{
+                    "offset": offset,
+                    "limit": limit,
+                    "cursor": cursor
+                })
+            except ValidationError as e:
+                return errors_to_response(e.errors())
+            try:
+                assert not data.cursor or len(data.cursor) == cursor_keys
+            except AssertionError:
+                raise BadRequest(description="invalid cursor")
+            if data.cursor:
+                data.offset = 0
+            return f(data.offset, data.limit, data.cursor, *args, **kwargs)
+        return decorated
+    return decorator
+
+def expand_optional(f):
+    """
+    Verifies request params contain a valid comma separated expand list
+    (related collections to embed), defaults to no expansion
     """
     @wraps(f)
     def decorated(*args, **kwargs):
-        offset = request.args.get('offset')
-        limit = request.args.get('limit')
-        if not offset:
-            offset = 0
-        if not limit:
-            limit = 100
+        expand = request.args.get('expand')
         try:
-            data = PaginationSchema(**{
-                "offset": offset,
-                "limit": limit
+            data = ExpandSchema(**{
+                "expand": [e for e in expand.split(",") if e] if expand else []
             })
         except ValidationError as e:
             return errors_to_response(e.errors())
-        return f(data.offset, data.limit, *args, **kwargs)
-    return decorated
\ No newline at end of file
+        return f({field.value for field in data.expand}, *args, **kwargs)
+    return decorated
+
+def search_required(f):
+    """
+    Verifies request params contain a valid search query (q)
+    """
+    @wraps(f)
+    def decorated(*args, **kwargs):
+        try:
+            data = SearchSchema(q=request.args.get('q', ''))
+        except ValidationError as e:
+            return errors_to_response(e.errors())
+        return f(data.q, *args, **kwargs)
+    return decorated
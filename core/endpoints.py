@@ -1,34 +1,48 @@
 import json
 from os import remove
-from flask import Blueprint, current_app, jsonify
+from flask import Blueprint, current_app, g, jsonify, request, stream_with_context
 from datetime import datetime, timedelta
 from flask.wrappers import Response
-from core.app import database as db
+from core.app import database as db, metrics, response_cache, serializer
 from pydantic.error_wrappers import ValidationError
 from werkzeug.exceptions import BadRequest, Forbidden, NotFound, Unauthorized
-from werkzeug.security import check_password_hash
 import jwt
 from .models import (
     User,
     Todo,
-    Review
+    Item,
+    Review,
+    record_type,
+    to_records
 )
 from .schemas import (
     CredentialsShema,
     CreateTodoSchema,
+    ImportTodoSchema,
     CreateItemSchema,
+    CreateItemsBatchSchema,
     CreateReviewSchema,
     UpdateTodoSchema,
     UpdateItemSchema,
+    UpdateItemsSchema,
+    DeleteItemsSchema,
     UpdateReviewSchema,
+    encode_cursor,
+    STREAM_BATCH_SIZE,
+    IMPORT_CHUNK_SIZE,
+    errors_to_dict,
     errors_to_response
 )
+from .instrumentation import query_budget
+from .ratelimit import check_rate_limits
 from .decorators import (
     json_required,
     bearer_required,
     bearer_optional,
+    expand_optional,
     pagination_required,
-    refresh_required
+    refresh_required,
+    search_required
 )
 
 # TODO: Delete user todo items on user delete
@@ -39,10 +53,113 @@ auth = Blueprint(name='auth', import_name=__name__)
 users = Blueprint(name='users', import_name=__name__)
 todos = Blueprint(name='todos', import_name=__name__)
 reviews = Blueprint(name='reviews', import_name=__name__)
+monitoring = Blueprint(name='monitoring', import_name=__name__)
+
+
+### RATE LIMITS ###
+# limits and costs are read from the app config per request
+for blueprint in (auth, users, todos, reviews):
+    blueprint.before_request(check_rate_limits)
+
+
+### HELPERS ###
+def get_infos(model, rows):
+    """
+    Serialize a list of entries or column-tuple rows
+    """
+
+    base_url = current_app.config["BASE_URL"]
+    return [model.row_info(row, base_url) for row in rows]
+
+def get_todo_infos(todos, expand=()):
+    """
+    Serialize a list of todos, embedding the expanded collections
+    """
+
+    expanded = Todo.expand(todos, expand)
+    base_url = current_app.config["BASE_URL"]
+    return [dict(Todo.row_info(todo, base_url), **expanded[todo.id]) for todo in todos]
+
+def page_response(rows, offset, limit, key, model, serialize=None):
+    """
+    Build a list response, exposing the cursor of the next page
+    in the X-Next-Cursor header when the page is full
+    key is the tuple of columns the rows are sorted on
+    (None for rankings only paged with offset),
+    rows are read as records of model.info_columns()
+    """
+
+    rows = rows.with_entities(*model.info_columns())
+    if serialize is None:
+        serialize = lambda rows: get_infos(model, rows)
+    if g.get("stream"):
+        return stream_page(rows, offset, limit, key, model, serialize)
+    rows = to_records(model, rows.all())
+    response = serializer.response(serialize(rows))
+    if key and len(rows) == limit:
+        last = tuple(getattr(rows[-1], column.key) for column in key)
+        response.headers["X-Next-Cursor"] = encode_cursor(last)
+    return response
+
+def stream_page(rows, offset, limit, key, model, serialize):
+    """
+    Stream a list response as a JSON array, rows are fetched from
+    a yield_per cursor and serialized in batches
+    The next cursor is looked up beforehand since headers go first
+    """
+
+    last = None
+    if key:
+        last = rows.with_entities(*key).offset(offset + limit - 1).limit(1).first()
+
+    def generate():
+        yield b"["
+        separator = b""
+        batch = list()
+        for row in rows.yield_per(STREAM_BATCH_SIZE):
+            batch.append(row)
+            if len(batch) < STREAM_BATCH_SIZE:
+                continue
+            for info in serialize(to_records(model, batch)):
+                yield separator + serializer.dumps(info)
+                separator = b","
+            batch = list()
+        for info in serialize(to_records(model, batch)):
+            yield separator + serializer.dumps(info)
+            separator = b","
+        yield b"]"
+
+    response = current_app.response_class(
+        stream_with_context(generate()), mimetype="application/json"
+    )
+    if last:
+        response.headers["X-Next-Cursor"] = encode_cursor(tuple(last))
+    return response
+
+
+def stream_ndjson(sources):
+    """
+    Stream (type, model, query) sources as newline delimited JSON,
+    column-tuple rows are fetched from yield_per cursors
+    """
+
+    def generate():
+        base_url = current_app.config["BASE_URL"]
+        for type, model, rows in sources:
+            rows = rows.with_entities(*model.info_columns())
+            record = record_type(model)
+            for row in rows.yield_per(STREAM_BATCH_SIZE):
+                info = model.row_info(record(row), base_url)
+                yield serializer.dumps(dict(type=type, **info)) + b"\n"
+
+    return current_app.response_class(
+        stream_with_context(generate()), mimetype="application/x-ndjson"
+    )
 
 
 ### ROUTES ###
 @auth.route("register", methods=["POST"])
+@query_budget(3)
 @json_required
 def create_user(json_data):
     """
@@ -64,6 +181,7 @@ def create_user(json_data):
     
 
 @auth.route("token", methods=["POST"])
+@query_budget(2)
 @json_required
 def create_bearer(json_data):
     """
@@ -80,9 +198,10 @@ def create_bearer(json_data):
     except AssertionError:
         raise Unauthorized(description="could not authorize")
     try:
-        assert check_password_hash(user.password, parsed.password)
+        assert user.check_password(parsed.password)
     except AssertionError:
         raise Unauthorized(description="could not authorize")
+    db.session.commit()
     bearer = jwt.encode(
         payload={
             "uid": user.id,
@@ -105,6 +224,7 @@ def create_bearer(json_data):
     }, 201
 
 @auth.route("refresh", methods=["POST"])
+@query_budget(1)
 @refresh_required
 def refresh_bearer(current_user):
     """
@@ -125,6 +245,7 @@ def refresh_bearer(current_user):
 
 
 @users.route("<username>", methods=["GET"])
+@query_budget(1)
 @bearer_required
 def get_user_info(current_user, username):
     """
@@ -137,7 +258,29 @@ def get_user_info(current_user, username):
         raise Unauthorized(description="could not authenticate")
     return current_user.get_info()
 
+@users.route("<username>/export", methods=["GET"])
+@bearer_required
+def export_user_data(current_user, username):
+    """
+    Stream all user todos, items and reviews as NDJSON
+    (only available to the user)
+    """
+
+    try:
+        assert current_user.username == username
+    except:
+        raise Unauthorized(description="could not authenticate")
+    response = stream_ndjson([
+        ("user", User, User.query.filter_by(id=current_user.id)),
+        ("todo", Todo, current_user.todos.order_by(Todo.id)),
+        ("item", Item, current_user.get_items()),
+        ("review", Review, current_user.reviews.order_by(Review.id))
+    ])
+    response.headers["Content-Disposition"] = f"attachment; filename={username}.ndjson"
+    return response
+
 @users.route("<username>", methods=["PATCH"])
+@query_budget(3)
 @json_required
 @bearer_required
 def update_user_info(current_user, json_data, username):
@@ -162,6 +305,7 @@ def update_user_info(current_user, json_data, username):
     return Response(status=200)
 
 @users.route("<username>", methods=["DELETE"])
+@query_budget(8)
 @bearer_required
 def delete_user(current_user, username):
     """
@@ -174,44 +318,75 @@ def delete_user(current_user, username):
         raise Unauthorized(description="could not authenticate")
     current_user.delete()
     db.session.commit()
+    response_cache.invalidate("*")
     return Response(status=200)
 
 
 @todos.route("best", methods=["GET"])
-@pagination_required
-def get_top_todos(offset, limit):
+@query_budget(1)
+@pagination_required(cursor_keys=2)
+def get_top_todos(offset, limit, cursor):
     """
     Get top X todos (specify limit in parameters)
     """
 
-    result = list()
-    todos = Todo.best(offset, limit)
-    for todo in todos:
-        result.append(todo.get_info())
-    return jsonify(result)
+    todos = Todo.best(offset, limit, cursor)
+    return page_response(
+        todos, offset, limit, (Todo.avg_stars, Todo.id), Todo, get_todo_infos
+    )
 
 @todos.route("", methods=["GET"])
-@pagination_required
+@query_budget(4)
+@expand_optional
+@pagination_required()
 @bearer_optional
-def get_all_todos(current_user, offset, limit):
+@response_cache.cached("todos")
+def get_all_todos(current_user, offset, limit, cursor, expand):
     """
-    Fetch all todos
+    Fetch all todos (embed related collections with ?expand=items,reviews)
     """
 
     if current_user:
-        todos = Todo.get_all_public_or_by_user(current_user, offset, limit)
+        todos = Todo.get_all_public_or_by_user(
+            current_user, offset, limit, cursor
+        )
     else:
-        todos = Todo.get_all_public(offset, limit)
-    result = list()
-    for todo in todos:
-        result.append(todo.get_info())
-    return jsonify(result)
+        todos = Todo.get_all_public(offset, limit, cursor)
+    return page_response(
+        todos, offset, limit, (Todo.id,), Todo,
+        lambda todos: get_todo_infos(todos, expand)
+    )
+
+@todos.route("search", methods=["GET"])
+@query_budget(4)
+@search_required
+@expand_optional
+@pagination_required()
+@bearer_optional
+def search_todos(current_user, offset, limit, cursor, expand, text):
+    """
+    Full-text search of todo titles and items, ranked by relevance
+    (paged with offset, embed related collections with ?expand=items,reviews)
+    """
+
+    try:
+        assert not cursor
+    except AssertionError:
+        raise BadRequest(description="search results are paged with offset")
+    todos = Todo.search(text, current_user, offset, limit)
+    return page_response(
+        todos, offset, limit, None, Todo,
+        lambda todos: get_todo_infos(todos, expand)
+    )
 
 @todos.route("<int:todo_id>", methods=["GET"])
+@query_budget(4)
+@expand_optional
 @bearer_optional
-def get_todo_info(current_user, todo_id):
+@response_cache.cached("todo:{todo_id}")
+def get_todo_info(current_user, expand, todo_id):
     """
-    Fetch specific todo info
+    Fetch specific todo info (embed related collections with ?expand=items,reviews)
     """
 
     if current_user:
@@ -222,9 +397,10 @@ def get_todo_info(current_user, todo_id):
         assert todo
     except AssertionError:
         raise NotFound(description="todo not found")
-    return todo.get_info()
+    return get_todo_infos([todo], expand)[0]
 
 @todos.route("", methods=["POST"])
+@query_budget(3)
 @bearer_required
 @json_required
 def create_todo(json_data, current_user):
@@ -238,9 +414,62 @@ def create_todo(json_data, current_user):
         return errors_to_response(e.errors())
     todo = current_user.create_todo(parsed)
     db.session.commit()
+    response_cache.invalidate("todos")
     return jsonify(todo.get_info()), 201
 
+@todos.route("import", methods=["POST"])
+@bearer_required
+def import_todos(current_user):
+    """
+    Import todos with embedded items from an NDJSON body
+    (one CreateTodoSchema object with an 'items' list per line),
+    written in chunked transactions
+    """
+
+    try:
+        assert request.mimetype == "application/x-ndjson"
+    except AssertionError:
+        raise BadRequest(description="content-type must be application/x-ndjson")
+    created = 0
+    created_items = 0
+    errors = list()
+    chunk = list()
+
+    def flush():
+        nonlocal created, created_items
+        created_items += Todo.import_many(current_user, chunk)
+        db.session.commit()
+        created += len(chunk)
+        chunk.clear()
+
+    for line_number, line in enumerate(request.stream, start=1):
+        if not line.strip():
+            continue
+        try:
+            data = json.loads(line)
+            assert isinstance(data, dict)
+        except (ValueError, AssertionError):
+            errors.append({"line": line_number, "errors": {"json": "invalid json format"}})
+            continue
+        try:
+            chunk.append(ImportTodoSchema(**data))
+        except ValidationError as e:
+            errors.append({"line": line_number, "errors": errors_to_dict(e.errors())})
+            continue
+        if len(chunk) >= IMPORT_CHUNK_SIZE:
+            flush()
+    if chunk:
+        flush()
+    if created:
+        response_cache.invalidate("todos")
+    return {
+        "created": created,
+        "items": created_items,
+        "errors": errors
+    }, 201 if created else 400
+
 @todos.route("<int:todo_id>", methods=["PATCH"])
+@query_budget(3)
 @bearer_required
 @json_required
 def update_todo(json_data, current_user, todo_id):
@@ -259,9 +488,11 @@ def update_todo(json_data, current_user, todo_id):
         return errors_to_response(e.errors())
     todo.update(parsed)
     db.session.commit()
+    response_cache.invalidate("todos", f"todo:{todo_id}", "reviews")
     return Response(status=200)
 
 @todos.route("<int:todo_id>", methods=["DELETE"])
+@query_budget(7)
 @bearer_required
 def delete_todo(current_user, todo_id):
     """
@@ -275,12 +506,15 @@ def delete_todo(current_user, todo_id):
         raise NotFound(description="todo not found")
     todo.delete()
     db.session.commit()
+    response_cache.invalidate("todos", f"todo:{todo_id}", "reviews")
     return Response(status=200)
 
 @todos.route("<int:todo_id>/items", methods=["GET"])
-@pagination_required
+@query_budget(3)
+@pagination_required()
 @bearer_optional
-def get_todo_items(current_user, offset, limit, todo_id):
+@response_cache.cached("todo:{todo_id}")
+def get_todo_items(current_user, offset, limit, cursor, todo_id):
     """
     Fetch todo items
     """
@@ -293,13 +527,11 @@ def get_todo_items(current_user, offset, limit, todo_id):
         assert todo
     except AssertionError:
         raise NotFound(description="todo not found")
-    items = todo.get_items(offset, limit)
-    result = list()
-    for item in items:
-        result.append(item.get_info())
-    return jsonify(result)
+    items = todo.get_items(offset, limit, cursor)
+    return page_response(items, offset, limit, (Item.id,), Item)
 
 @todos.route("<int:todo_id>/items", methods=["POST"])
+@query_budget(5)
 @bearer_required
 @json_required
 def create_todo_item(json_data, current_user, todo_id):
@@ -317,14 +549,91 @@ def create_todo_item(json_data, current_user, todo_id):
     except ValidationError as e:
         return errors_to_response(e.errors())
     try:
-        assert not todo.is_full()
+        assert todo.reserve_items([parsed])
     except AssertionError:
         raise BadRequest(description="todo can contain up to 100 items")
     item = todo.add_item(parsed)
     db.session.commit()
+    response_cache.invalidate("todos", f"todo:{todo_id}")
     return jsonify(item.get_info()), 201
 
+@todos.route("<int:todo_id>/items/batch", methods=["POST"])
+@query_budget(5)
+@bearer_required
+@json_required
+def create_todo_items(json_data, current_user, todo_id):
+    """
+    Add a batch of items to a todo list
+    """
+
+    todo = current_user.get_todo_by_id(todo_id)
+    try:
+        assert todo
+    except AssertionError:
+        raise NotFound(description="todo not found")
+    try:
+        parsed = CreateItemsBatchSchema(**json_data)
+    except ValidationError as e:
+        return errors_to_response(e.errors())
+    try:
+        assert todo.reserve_items(parsed.items)
+    except AssertionError:
+        raise BadRequest(description="todo can contain up to 100 items")
+    items = todo.add_items(parsed)
+    # serialize before commit expires every created item
+    result = [item.get_info() for item in items]
+    db.session.commit()
+    response_cache.invalidate("todos", f"todo:{todo_id}")
+    return jsonify(result), 201
+
+@todos.route("<int:todo_id>/items", methods=["PATCH"])
+@query_budget(4)
+@bearer_required
+@json_required
+def update_todo_items(json_data, current_user, todo_id):
+    """
+    Update todo items matching an ID list or a predicate
+    """
+
+    todo = current_user.get_todo_by_id(todo_id)
+    try:
+        assert todo
+    except AssertionError:
+        raise NotFound(description="todo not found")
+    try:
+        parsed = UpdateItemsSchema(**json_data)
+    except ValidationError as e:
+        return errors_to_response(e.errors())
+    count = todo.update_items(parsed)
+    db.session.commit()
+    response_cache.invalidate("todos", f"todo:{todo_id}")
+    return {"count": count}
+
+@todos.route("<int:todo_id>/items", methods=["DELETE"])
+@query_budget(4)
+@bearer_required
+@json_required
+def delete_todo_items(json_data, current_user, todo_id):
+    """
+    Delete todo items matching an ID list or a predicate
+    """
+
+    todo = current_user.get_todo_by_id(todo_id)
+    try:
+        assert todo
+    except AssertionError:
+        raise NotFound(description="todo not found")
+    try:
+        parsed = DeleteItemsSchema(**json_data)
+    except ValidationError as e:
+        return errors_to_response(e.errors())
+    count = todo.delete_items(parsed)
+    db.session.commit()
+    response_cache.invalidate("todos", f"todo:{todo_id}")
+    return {"count": count}
+
 @todos.route("<int:todo_id>/items/<int:item_id>", methods=["GET"])
+@query_budget(3)
 @bearer_optional
 def get_item_info(current_user, todo_id, item_id):
     """
@@ -347,6 +656,7 @@ def get_item_info(current_user, todo_id, item_id):
     return item.get_info()
     
 @todos.route("<int:todo_id>/items/<int:item_id>", methods=["PATCH"])
+@query_budget(5)
 @bearer_required
 @json_required
 def update_item_info(json_data, current_user, todo_id, item_id):
@@ -368,11 +678,16 @@ def update_item_info(json_data, current_user, todo_id, item_id):
         parsed = UpdateItemSchema(**json_data)
     except ValidationError as e:
         return errors_to_response(e.errors())
-    item.update(parsed)
+    try:
+        assert item.update(parsed)
+    except AssertionError:
+        raise NotFound(description="item not found")
     db.session.commit()
+    response_cache.invalidate("todos", f"todo:{todo_id}")
     return Response(status=200)
 
 @todos.route("<int:todo_id>/items/<int:item_id>", methods=["DELETE"])
+@query_budget(5)
 @bearer_required
 def delete_item(current_user, todo_id, item_id):
     """
@@ -389,14 +704,20 @@ def delete_item(current_user, todo_id, item_id):
         assert item
     except AssertionError:
         raise NotFound(description="item not found")
-    item.delete()
+    try:
+        assert item.delete()
+    except AssertionError:
+        raise NotFound(description="item not found")
     db.session.commit()
+    response_cache.invalidate("todos", f"todo:{todo_id}")
     return Response(status=200)
 
 @todos.route("<int:todo_id>/reviews", methods=["GET"])
-@pagination_required
+@query_budget(3)
+@pagination_required()
 @bearer_optional
-def get_todo_reviews(current_user, offset, limit, todo_id):
+@response_cache.cached("todo:{todo_id}")
+def get_todo_reviews(current_user, offset, limit, cursor, todo_id):
     """
     Fetch todo reviews
     """
@@ -409,13 +730,11 @@ def get_todo_reviews(current_user, offset, limit, todo_id):
         assert todo
     except AssertionError:
         raise NotFound(description="todo not found")
-    reviews = todo.get_reviews(offset, limit)
-    result = list()
-    for review in reviews:
-        result.append(review.get_info())
-    return jsonify(result)
+    reviews = todo.get_reviews(offset, limit, cursor)
+    return page_response(reviews, offset, limit, (Review.id,), Review)
 
 @todos.route("<int:todo_id>/reviews", methods=["POST"])
+@query_budget(7)
 @bearer_required
 @json_required
 def create_todo_review(json_data, current_user, todo_id):
@@ -442,28 +761,50 @@ def create_todo_review(json_data, current_user, todo_id):
         return errors_to_response(e.errors())
     review = todo.add_review(parsed, current_user)
     db.session.commit()
+    response_cache.invalidate("todos", f"todo:{todo_id}", "reviews")
     return jsonify(review.get_info()), 201
 
 
 @reviews.route("", methods=["GET"])
-@pagination_required
+@query_budget(2)
+@pagination_required()
 @bearer_optional
-def get_all_reviews(current_user, offset, limit):
+@response_cache.cached("reviews")
+def get_all_reviews(current_user, offset, limit, cursor):
     """
     Fetch all reviews
     """
 
     if current_user:
-        reviews = Review.get_all_public_or_by_user(current_user, offset, limit)
+        reviews = Review.get_all_public_or_by_user(
+            current_user, offset, limit, cursor
+        )
     else:
-        reviews = Review.get_all_public(offset, limit)
-    result = list()
-    for review in reviews:
-        result.append(review.get_info())
-    return jsonify(result)
+        reviews = Review.get_all_public(offset, limit, cursor)
+    return page_response(reviews, offset, limit, (Review.id,), Review)
+
+@reviews.route("search", methods=["GET"])
+@query_budget(2)
+@search_required
+@pagination_required()
+@bearer_optional
+def search_reviews(current_user, offset, limit, cursor, text):
+    """
+    Full-text search of review titles and contents, ranked by relevance
+    (paged with offset)
+    """
+
+    try:
+        assert not cursor
+    except AssertionError:
+        raise BadRequest(description="search results are paged with offset")
+    reviews = Review.search(text, current_user, offset, limit)
+    return page_response(reviews, offset, limit, None, Review)
 
 @reviews.route("<int:review_id>", methods=["GET"])
+@query_budget(2)
 @bearer_optional
+@response_cache.cached("reviews")
 def get_review_info(current_user, review_id):
     """
     Fetch review info
@@ -480,6 +821,7 @@ def get_review_info(current_user, review_id):
     return review.get_info()
 
 @reviews.route("<int:review_id>", methods=["PATCH"])
+@query_budget(6)
 @bearer_required
 @json_required
 def update_review_info(json_data, current_user, review_id):
@@ -496,11 +838,16 @@ def update_review_info(json_data, current_user, review_id):
         parsed = UpdateReviewSchema(**json_data)
     except ValidationError as e:
         return errors_to_response(e.errors())
-    review.update(parsed)
+    try:
+        assert review.update(parsed)
+    except AssertionError:
+        raise NotFound(description="review not found")
     db.session.commit()
+    response_cache.invalidate("todos", f"todo:{review.todo_id}", "reviews")
     return Response(status=200)
 
 @reviews.route("<int:review_id>", methods=["DELETE"])
+@query_budget(5)
 @bearer_required
 def delete_review(current_user, review_id):
     """
@@ -512,6 +859,22 @@ def delete_review(current_user, review_id):
         assert review
     except AssertionError:
         raise NotFound(description="review not found")
-    review.delete()
+    todo_id = review.todo_id
+    try:
+        assert review.delete()
+    except AssertionError:
+        raise NotFound(description="review not found")
     db.session.commit()
+    response_cache.invalidate("todos", f"todo:{todo_id}", "reviews")
     return Response(status=200)
+
+
+@monitoring.route("", methods=["GET"])
+@query_budget(0)
+def get_metrics():
+    """
+    Expose the process metrics in the Prometheus text format
+    (not rate limited)
+    """
+
+    return Response(metrics.render(), mimetype="text/plain; version=0.0.4")
@@ -0,0 +1,72 @@
+from concurrent.futures import ThreadPoolExecutor
+from threading import BoundedSemaphore
+from werkzeug.exceptions import ServiceUnavailable
+from werkzeug.security import generate_password_hash, check_password_hash
+
+
+class PasswordHasher:
+    """
+    Runs password hashing on a dedicated, size-limited worker pool
+    so that login bursts can not starve the request threads
+    """
+
+    def __init__(self) -> None:
+        self.method = "pbkdf2:sha256:260000"
+        self.executor = None
+        self.slots = None
+        # how the caller waits for a job, replaced in asyncio mode
+        self.wait = lambda future: future.result()
+
+    def init_app(self, app):
+        """
+        Read PASSWORD_HASH_METHOD, PASSWORD_HASH_WORKERS and
+        PASSWORD_HASH_QUEUE (pending jobs allowed beyond the workers)
+        """
+
+        self.method = app.config.get("PASSWORD_HASH_METHOD", self.method)
+        workers = app.config.get("PASSWORD_HASH_WORKERS", 4)
+        queue = app.config.get("PASSWORD_HASH_QUEUE", 32)
+        if self.executor:
+            self.executor.shutdown(wait=False)
+        self.executor = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="password-hasher"
+        )
+        self.slots = BoundedSemaphore(workers + queue)
+
+    def run(self, f, *args):
+        """
+        Run f on the pool and wait for its result,
+        rejects the request when the queue is full
+        """
+
+        if not self.slots.acquire(blocking=False):
+            raise ServiceUnavailable(description="server busy, try again later")
+        try:
+            future = self.executor.submit(f, *args)
+        except Exception:
+            self.slots.release()
+            raise
+        future.add_done_callback(lambda _: self.slots.release())
+        return self.wait(future)
+
+    def hash(self, password):
+        """
+        Generate a password hash with the configured method and cost
+        """
+
+        return self.run(generate_password_hash, password, self.method)
+
+    def verify(self, pwhash, password):
+        """
+        Returns True if password matches the hash
+        """
+
+        return self.run(check_password_hash, pwhash, password)
+
+    def needs_rehash(self, pwhash):
+        """
+        Returns True if the hash was not generated with
+        the configured method and cost
+        """
+
+        return pwhash.split("$", 1)[0] != self.method
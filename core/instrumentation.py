@@ -0,0 +1,164 @@
+import json
+from time import perf_counter
+from flask import current_app, g, has_request_context, request
+from flask.wrappers import Response
+from sqlalchemy import event
+from core.app import (
+    database,
+    error_log,
+    metrics,
+    response_cache,
+    token_cache,
+    user_cache
+)
+
+
+def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start", list()).append(perf_counter())
+
+def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = perf_counter() - conn.info["query_start"].pop()
+    if has_request_context():
+        g.query_count = g.get("query_count", 0) + 1
+        g.query_time = g.get("query_time", 0) + elapsed
+
+def instrument_engine(engine):
+    """
+    Count statements and accumulate DB time per request
+    """
+
+    if not event.contains(engine, "before_cursor_execute", before_cursor_execute):
+        event.listen(engine, "before_cursor_execute", before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", after_cursor_execute)
+
+def query_budget(budget):
+    """
+    Declare the maximum number of statements a view may issue,
+    must be applied directly under the route decorator
+    Streamed responses are excluded (their statements grow with
+    the stream length and run after the budget check)
+    """
+
+    def decorator(f):
+        f.query_budget = budget
+        return f
+    return decorator
+
+def record_query_totals(stats, endpoint):
+    count = stats.get("query_count", 0)
+    elapsed = stats.get("query_time", 0)
+    metrics.inc("db_queries_total", count, endpoint=endpoint)
+    metrics.inc("db_seconds_total", elapsed, endpoint=endpoint)
+    return count, elapsed
+
+def record_query_stats(response):
+    """
+    Record per-request query totals, expose them as headers
+    (QUERY_STATS_HEADERS) and enforce declared query budgets
+    (QUERY_BUDGET_ENFORCE)
+    Streamed bodies query while they are sent, after this hook,
+    so their totals are recorded once the response is closed
+    """
+
+    endpoint = request.endpoint or "unknown"
+    if response.is_streamed:
+        stats = g._get_current_object()
+        response.call_on_close(lambda: record_query_totals(stats, endpoint))
+        return response
+    count, elapsed = record_query_totals(g, endpoint)
+    if current_app.config.get("QUERY_STATS_HEADERS"):
+        response.headers["X-Query-Count"] = str(count)
+        response.headers["X-DB-Time"] = f"{elapsed * 1000:.3f}ms"
+    view = current_app.view_functions.get(request.endpoint)
+    budget = getattr(view, "query_budget", None)
+    if budget is not None and count > budget:
+        metrics.inc("db_query_budget_exceeded_total", endpoint=endpoint)
+        if current_app.config.get("QUERY_BUDGET_ENFORCE"):
+            message = f"query budget exceeded on {endpoint}: {count} > {budget}"
+            error_log.write(message)
+            return Response(
+                json.dumps({"message": message}),
+                status=500,
+                mimetype="application/json"
+            )
+    return response
+
+def start_request():
+    g.request_start = perf_counter()
+    metrics.add("http_requests_in_flight", 1)
+
+def record_request(response):
+    """
+    Record the request latency per route and status,
+    and count the requests rejected by the rate limiter
+    """
+
+    start = g.get("request_start")
+    endpoint = request.endpoint or "unknown"
+    if start is not None:
+        metrics.observe(
+            "http_request_duration_seconds",
+            perf_counter() - start,
+            endpoint=endpoint,
+            method=request.method,
+            status=response.status_code
+        )
+    if response.status_code == 429:
+        metrics.inc("ratelimit_rejections_total", endpoint=endpoint)
+    return response
+
+def end_request(exception):
+    if g.pop("request_start", None) is not None:
+        metrics.add("http_requests_in_flight", -1)
+
+def hit_ratio(stats):
+    lookups = stats.get("hits", 0) + stats.get("misses", 0)
+    return stats.get("hits", 0) / lookups if lookups else 0.0
+
+def register_cache_metrics():
+    caches = (
+        ("user", user_cache),
+        ("token", token_cache),
+        ("response", response_cache)
+    )
+    for name, cache in caches:
+        metrics.register(
+            "cache_hits_total",
+            lambda cache=cache: cache.stats().get("hits", 0),
+            "counter",
+            cache=name
+        )
+        metrics.register(
+            "cache_misses_total",
+            lambda cache=cache: cache.stats().get("misses", 0),
+            "counter",
+            cache=name
+        )
+        metrics.register(
+            "cache_evictions_total",
+            lambda cache=cache: cache.stats().get("evictions", 0),
+            "counter",
+            cache=name
+        )
+        metrics.register(
+            "cache_hit_ratio",
+            lambda cache=cache: hit_ratio(cache.stats()),
+            cache=name
+        )
+    metrics.register("error_log_dropped_total", lambda: error_log.dropped, "counter")
+
+def init_app(app):
+    """
+    Wire the engine event hooks and the per-request recorders
+    """
+
+    with app.app_context():
+        for engine in database.engines():
+            instrument_engine(engine)
+    # ahead of the limiter check, so rejected requests are timed too
+    app.before_request_funcs.setdefault(None, []).insert(0, start_request)
+    # after_request hooks run in reverse, latency sees the final status
+    app.after_request(record_request)
+    app.after_request(record_query_stats)
+    app.teardown_request(end_request)
+    register_cache_metrics()
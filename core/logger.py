@@ -1,11 +1,120 @@
+import atexit
+import os
 from datetime import datetime
+from queue import Queue, Empty, Full
+from threading import Lock, Thread
+from time import monotonic
 
 class Log:
-    def __init__(self, file) -> None:
+    """
+    Non-blocking log writer, records are queued by the caller and
+    appended in batches by a background thread
+    """
+
+    def __init__(
+        self,
+        file,
+        queue_size=10000,
+        batch_size=100,
+        flush_interval=1.0,
+        max_bytes=10 * 1024 * 1024,
+        backups=5
+    ) -> None:
         self.file = file
-    
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.dropped = 0
+        self.queue = Queue(queue_size)
+        self._thread = None
+        self._lock = Lock()
+
+    def init_app(self, app):
+        """
+        Read the ERROR_LOG_* settings from the app config
+        """
+
+        self.file = app.config.get("ERROR_LOG_FILE", self.file)
+        self.batch_size = app.config.get("ERROR_LOG_BATCH_SIZE", self.batch_size)
+        self.flush_interval = app.config.get("ERROR_LOG_FLUSH_INTERVAL", self.flush_interval)
+        self.max_bytes = app.config.get("ERROR_LOG_MAX_BYTES", self.max_bytes)
+        self.backups = app.config.get("ERROR_LOG_BACKUPS", self.backups)
+        if "ERROR_LOG_QUEUE_SIZE" in app.config and self._thread is None:
+            self.queue = Queue(app.config["ERROR_LOG_QUEUE_SIZE"])
+
     def write(self, text):
-        with open(self.file, "a") as f:
-            f.write(
-                f"[{datetime.now()}]--[{text}]\n"
-            )
\ No newline at end of file
+        """
+        Queue a record, drops it (counted in self.dropped)
+        instead of blocking when the queue is full
+        """
+
+        self._start()
+        try:
+            self.queue.put_nowait(f"[{datetime.now()}]--[{text}]\n")
+        except Full:
+            with self._lock:
+                self.dropped += 1
+
+    def close(self):
+        """
+        Flush queued records and stop the writer thread
+        """
+
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread:
+            self.queue.put(None)
+            thread.join()
+
+    def _start(self):
+        # started lazily, so forked workers get their own thread
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = Thread(
+                    target=self._run, name="log-writer", daemon=True
+                )
+                self._thread.start()
+                atexit.register(self.close)
+
+    def _run(self):
+        batch = list()
+        deadline = monotonic() + self.flush_interval
+        while True:
+            try:
+                record = self.queue.get(timeout=max(0, deadline - monotonic()))
+            except Empty:
+                record = ""
+            if record is None:
+                self._flush(batch)
+                return
+            if record:
+                batch.append(record)
+            if len(batch) >= self.batch_size or monotonic() >= deadline:
+                self._flush(batch)
+                batch = list()
+                deadline = monotonic() + self.flush_interval
+
+    def _flush(self, batch):
+        if not batch:
+            return
+        try:
+            if os.path.exists(self.file) \
+                and os.path.getsize(self.file) >= self.max_bytes:
+                self._rotate()
+            with open(self.file, "a") as f:
+                f.writelines(batch)
+        except OSError:
+            with self._lock:
+                self.dropped += len(batch)
+
+    def _rotate(self):
+        for i in range(self.backups - 1, 0, -1):
+            if os.path.exists(f"{self.file}.{i}"):
+                os.replace(f"{self.file}.{i}", f"{self.file}.{i + 1}")
+        if self.backups > 0:
+            os.replace(self.file, f"{self.file}.1")
+        else:
+            os.remove(self.file)
@@ -0,0 +1,187 @@
+import weakref
+from threading import Lock, local
+
+
+DEFAULT_BUCKETS = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+    0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+
+
+def format_labels(labels, **extra):
+    """
+    Render a label set in the Prometheus text format
+    """
+
+    labels = labels + tuple(extra.items())
+    if not labels:
+        return ""
+    escape = lambda value: str(value).replace("\\", "\\\\") \
+        .replace("\"", "\\\"").replace("\n", "\\n")
+    return "{" + ",".join(f"{name}=\"{escape(value)}\"" for name, value in labels) + "}"
+
+def format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+def merge_shard(into, shard):
+    """
+    Add the counters and histograms of shard to into
+    """
+
+    counters, histograms = into
+    for key, value in shard[0].copy().items():
+        counters[key] = counters.get(key, 0) + value
+    for key, (buckets, counts, total, count) in shard[1].copy().items():
+        merged = histograms.get(key)
+        if merged is None:
+            merged = histograms[key] = [buckets, [0] * len(buckets), 0, 0]
+        merged[1] = [a + b for a, b in zip(merged[1], counts)]
+        merged[2] += total
+        merged[3] += count
+
+
+class ShardOwner:
+    """
+    Thread-local marker, collected when its thread exits
+    """
+
+
+class Metrics:
+    """
+    Process-wide registry of labelled counters, histograms and gauges
+    (aggregated per process, not across workers)
+    Every thread writes to its own shard without locking,
+    readers aggregate the shards
+    The shard of an exited thread is folded into a base total,
+    so short-lived request threads do not pile up shards
+    """
+
+    def __init__(self) -> None:
+        self.types = dict()
+        self.callbacks = dict()
+        self._base = ({}, {})
+        self._shards = list()
+        self._local = local()
+        self._lock = Lock()
+
+    def _shard(self):
+        shard = getattr(self._local, "shard", None)
+        if shard is None:
+            shard = self._local.shard = ({}, {})
+            self._local.owner = owner = ShardOwner()
+            with self._lock:
+                self._shards.append(shard)
+            weakref.finalize(owner, self._retire, shard)
+        return shard
+
+    def _retire(self, shard):
+        # readers aggregate under the lock, so the shard is counted once
+        with self._lock:
+            merge_shard(self._base, shard)
+            self._shards.remove(shard)
+
+    def _add(self, name, value, labels):
+        counters = self._shard()[0]
+        key = (name, tuple(sorted(labels.items())))
+        counters[key] = counters.get(key, 0) + value
+
+    def inc(self, name, value=1, **labels):
+        """
+        Increment counter name{labels} by value
+        """
+
+        self.types.setdefault(name, "counter")
+        self._add(name, value, labels)
+
+    def add(self, name, value, **labels):
+        """
+        Add value (possibly negative) to gauge name{labels}
+        """
+
+        self.types.setdefault(name, "gauge")
+        self._add(name, value, labels)
+
+    def observe(self, name, value, buckets=DEFAULT_BUCKETS, **labels):
+        """
+        Record value in histogram name{labels}
+        """
+
+        self.types.setdefault(name, "histogram")
+        histograms = self._shard()[1]
+        key = (name, tuple(sorted(labels.items())))
+        histogram = histograms.get(key)
+        if histogram is None:
+            histogram = histograms[key] = [buckets, [0] * len(buckets), 0, 0]
+        for i, bound in enumerate(buckets):
+            if value <= bound:
+                histogram[1][i] += 1
+                break
+        histogram[2] += value
+        histogram[3] += 1
+
+    def register(self, name, f, kind="gauge", **labels):
+        """
+        Register metric name{labels} of the given kind,
+        its value is f() at collection time
+        """
+
+        self.types[name] = kind
+        self.callbacks[(name, tuple(sorted(labels.items())))] = f
+
+    def get(self, name, **labels):
+        """
+        Returns the current value of counter name{labels}
+        """
+
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            shards = [self._base] + self._shards
+            return sum(counters.get(key, 0) for counters, _ in shards)
+
+    def collect(self):
+        """
+        Returns the aggregated counters and histograms
+        ({(name, labels): value}, {(name, labels): (buckets, counts, sum, count)})
+        """
+
+        collected = ({}, {})
+        with self._lock:
+            for shard in [self._base] + self._shards:
+                merge_shard(collected, shard)
+        return collected
+
+    def render(self):
+        """
+        Returns every metric in the Prometheus text exposition format
+        """
+
+        counters, histograms = self.collect()
+        samples = dict()
+        for (name, labels), value in sorted(counters.items()):
+            samples.setdefault(name, list()).append(
+                f"{name}{format_labels(labels)} {format_value(value)}"
+            )
+        for (name, labels), (buckets, counts, total, count) in sorted(
+            histograms.items(), key=lambda item: item[0]
+        ):
+            lines = samples.setdefault(name, list())
+            cumulative = 0
+            for bound, bucket in zip(buckets, counts):
+                cumulative += bucket
+                lines.append(
+                    f"{name}_bucket{format_labels(labels, le=format_value(bound))} {cumulative}"
+                )
+            lines.append(f"{name}_bucket{format_labels(labels, le='+Inf')} {count}")
+            lines.append(f"{name}_sum{format_labels(labels)} {format_value(total)}")
+            lines.append(f"{name}_count{format_labels(labels)} {count}")
+        for (name, labels), f in sorted(self.callbacks.items(), key=lambda item: item[0]):
+            samples.setdefault(name, list()).append(
+                f"{name}{format_labels(labels)} {format_value(f())}"
+            )
+        output = list()
+        for name in sorted(samples):
+            output.append(f"# TYPE {name} {self.types.get(name, 'untyped')}")
+            output.extend(samples[name])
+        return "\n".join(output) + "\n"
@@ -1,9 +1,21 @@
 from datetime import datetime
+from functools import lru_cache
 from flask import current_app
-from sqlalchemy.sql.expression import and_, or_
-from core.app import database as db
-from sqlalchemy_utils import aggregated
-from werkzeug.security import generate_password_hash
+from sqlalchemy.sql.expression import and_, or_, UnaryExpression
+from sqlalchemy.sql.operators import custom_op
+from core.app import database as db, user_cache, password_hasher
+from core.schemas import TODO_MAX_ITEMS
+from core.search import (
+    defer_todo_documents,
+    rebuild_todo_documents,
+    match,
+    rank,
+    todo_fts,
+    review_fts,
+    TODO_FTS_WEIGHTS,
+    REVIEW_FTS_WEIGHTS
+)
+from sqlalchemy.orm import make_transient_to_detached
 from sqlalchemy import (
     Column,
     ForeignKey,
@@ -12,10 +24,74 @@ from sqlalchemy import (
     Boolean,
     DateTime,
     Float,
-    func
+    Index,
+    exists,
+    func,
+    select
 )
 
 
+### HELPERS ###
+def paginate(query, column, offset=0, limit=100, cursor=None):
+    """
+    Apply keyset pagination on a unique column when a cursor is given,
+    otherwise fall back to the legacy offset pagination
+    """
+
+    if cursor:
+        query = query.filter(column > cursor[-1])
+    return query.order_by(column).offset(offset).limit(limit)
+
+def unindexed(column):
+    """
+    Column behind SQLite's unary + so that the planner can not drive
+    the query from its indexes, used on visibility filters of pages
+    that must be read in primary key order rather than sorted
+    """
+
+    return UnaryExpression(column, operator=custom_op("+"), type_=column.type)
+
+def visible_todo(todo_id, user=None):
+    """
+    Correlated EXISTS on the todo of a row being public (or owned by user),
+    lets the page scan its own table in key order
+    """
+
+    visible = Todo.public == True
+    if user:
+        visible = or_(visible, Todo.user_id == user.id)
+    return exists().where(Todo.id == todo_id, visible)
+
+class Record:
+    """
+    Lightweight row of a column-tuple query, read by row_info
+    (named attribute access on sqlalchemy rows is much slower)
+    """
+
+    __slots__ = ()
+
+    def __init__(self, values) -> None:
+        for name, value in zip(self.__slots__, values):
+            setattr(self, name, value)
+
+@lru_cache(maxsize=None)
+def record_type(model):
+    """
+    Returns the Record class holding model.info_columns()
+    """
+
+    keys = tuple(column.key for column in model.info_columns())
+    return type(f"{model.__name__}Record", (Record,), {"__slots__": keys})
+
+def to_records(model, rows):
+    """
+    Wrap column-tuple rows of model.info_columns() in records
+    """
+
+    record = record_type(model)
+    return [record(row) for row in rows]
+
+
 ### MODELS ###
 class User(db.Model):
     """ ORM for 'user' table """
@@ -23,7 +99,7 @@ class User(db.Model):
     __tablename__ = "user"
     id = Column(Integer, primary_key=True)
     username = Column(String(50), unique=True)
-    password = Column(String(100))
+    password = Column(String(255))
     created = Column(DateTime, default=None)
     updated = Column(DateTime, default=None)
 
@@ -38,19 +114,19 @@ class User(db.Model):
 
         user = User(
             username=data.username,
-            password=generate_password_hash(data.password, "SHA256"),
+            password=password_hasher.hash(data.password),
             created=datetime.now()
         )
         db.session.add(user)
         return user
     
     @staticmethod
-    def get_all(offset=0, limit=100):
+    def get_all(offset=0, limit=100, cursor=None):
         """
         Fetch all users
         """
 
-        return db.session.query(User).offset(offset).limit(limit)
+        return paginate(db.session.query(User), User.id, offset, limit, cursor)
 
     @staticmethod
     def get_by_id(user_id):
@@ -60,6 +136,23 @@ class User(db.Model):
 
         return db.session.query(User).filter_by(id=user_id).first()
 
+    @staticmethod
+    def get_cached(user_id):
+        """
+        Fetch user by ID through the per-process identity cache,
+        cache hits are attached to the session without a query
+        """
+
+        snapshot = user_cache.get(user_id)
+        if snapshot is None:
+            user = User.get_by_id(user_id)
+            if user:
+                user_cache.set(user_id, user.to_dict())
+            return user
+        user = User(**snapshot)
+        make_transient_to_detached(user)
+        return db.session.merge(user, load=False)
+
     @staticmethod
     def get_by_username(username):
         """
@@ -81,27 +174,62 @@ class User(db.Model):
             "updated": self.updated
         }
 
-    def get_info(self):
+    @staticmethod
+    def info_columns():
         """
-        Get entry info
+        Columns read by row_info, for column-tuple queries
+        """
+
+        return (
+            User.id,
+            User.username,
+            User.created,
+            User.updated
+        )
+
+    @staticmethod
+    def row_info(row, base_url):
+        """
+        Get entry info from an instance or a column-tuple row
         """
 
         return {
-            "id": self.id,
-            "username": self.username,
-            "created": self.created,
-            "updated": self.updated,
-            "link": current_app.config["BASE_URL"] + "/users/" + self.username
+            "id": row.id,
+            "username": row.username,
+            "created": row.created,
+            "updated": row.updated,
+            "link": base_url + "/users/" + row.username
         }
 
+    def get_info(self):
+        """
+        Get entry info
+        """
+
+        return User.row_info(self, current_app.config["BASE_URL"])
+
     def update(self, data):
         """
         Update current entry
         """
         
         self.username = data.username
-        self.password = generate_password_hash(data.password, "SHA256")
+        self.password = password_hasher.hash(data.password)
         self.updated = datetime.now()
+        user_cache.delete(self.id)
+
+    def check_password(self, password):
+        """
+        Returns True if password matches, upgrading a hash made
+        with an outdated method or cost on success
+        """
+
+        if not password_hasher.verify(self.password, password):
+            return False
+        if password_hasher.needs_rehash(self.password):
+            self.password = password_hasher.hash(password)
+            user_cache.delete(self.id)
+        return True
 
     def create_todo(self, data):
         """
@@ -123,33 +251,37 @@ class User(db.Model):
 
         return self.todos.filter_by(id=todo_id).first()
 
-    def get_todos(self, offset=0, limit=100):
+    def get_todos(self, offset=0, limit=100, cursor=None):
         """
         Fetch all user todos
         """
 
-        return self.todos.offset(offset).limit(limit)
+        return paginate(self.todos, Todo.id, offset, limit, cursor)
 
-    def get_private_todos(self, offset=0, limit=100):
+    def get_private_todos(self, offset=0, limit=100, cursor=None):
         """
         Fetch user private todos
         """
 
-        return self.todos.filter_by(public=False).offset(offset).limit(limit)
+        return paginate(
+            self.todos.filter_by(public=False), Todo.id, offset, limit, cursor
+        )
 
-    def get_public_todos(self, offset=0, limit=100):
+    def get_public_todos(self, offset=0, limit=100, cursor=None):
         """
         Fetch user public todos
         """
 
-        return self.todos.filter_by(public=True).offset(offset).limit(limit)
+        return paginate(
+            self.todos.filter_by(public=True), Todo.id, offset, limit, cursor
+        )
 
-    def get_reviews(self, offset=0, limit=100):
+    def get_reviews(self, offset=0, limit=100, cursor=None):
         """
         Fetch user reviews
         """
 
-        return self.reviews.offset(offset).limit(limit)
+        return paginate(self.reviews, Review.id, offset, limit, cursor)
 
     def get_review_by_id(self, review_id):
         """
@@ -177,6 +309,17 @@ class User(db.Model):
             Todo.public == True
         ).first()
 
+    def get_items(self):
+        """
+        Fetch the items of all user todos
+        """
+
+        return db.session.query(Item).join(
+            Todo, Item.todo_id == Todo.id
+        ).filter(
+            Todo.user_id == self.id
+        )
+
     def delete_todos(self):
         """
         Delete all user todos
@@ -186,9 +329,32 @@ class User(db.Model):
 
     def delete_reviews(self):
         """
-        Delete all user reviews
+        Delete all user reviews,
+        subtracting them from the aggregates of the reviewed todos
         """
 
+        reviewed = select(Review.todo_id).where(
+            Review.user_id == self.id
+        )
+        user_reviews = db.session.query(Review).filter(
+            Review.todo_id == Todo.id,
+            Review.user_id == self.id
+        )
+        db.session.query(Todo).filter(
+            Todo.id.in_(reviewed)
+        ).update({
+            Todo.review_count: Todo.review_count - user_reviews.with_entities(
+                func.count(Review.id)
+            ).scalar_subquery(),
+            Todo.stars_sum: Todo.stars_sum - user_reviews.with_entities(
+                func.coalesce(func.sum(Review.stars), 0)
+            ).scalar_subquery()
+        }, synchronize_session=False)
+        db.session.query(Todo).filter(
+            Todo.id.in_(reviewed)
+        ).update({
+            Todo.avg_stars: Todo.stars_sum * 1.0 / func.nullif(Todo.review_count, 0)
+        }, synchronize_session=False)
         self.reviews.delete()
 
     def delete(self):
@@ -199,6 +365,7 @@ class User(db.Model):
         self.delete_todos()
         self.delete_reviews()
         db.session.delete(self)
+        user_cache.delete(self.id)
 
 
 class Todo(db.Model):
@@ -211,44 +378,145 @@ class Todo(db.Model):
     public = Column(Boolean, default=False)
     created = Column(DateTime, default=None)
     updated = Column(DateTime, default=None)
+    review_count = Column(Integer, default=0, server_default="0", nullable=False)
+    stars_sum = Column(Integer, default=0, server_default="0", nullable=False)
+    avg_stars = Column(Float, default=None)
+    item_count = Column(Integer, default=0, server_default="0", nullable=False)
+    completed_count = Column(Integer, default=0, server_default="0", nullable=False)
 
     items = db.relationship("Item", backref="todo", lazy="dynamic")
     reviews = db.relationship("Review", backref="todo", lazy="dynamic")
 
-    @aggregated('reviews', Column(Float, default=None))
-    def avg_stars(self):
+    __table_args__ = (
+        # pages of a user todos, read in id order
+        Index("ix_todo_user_id", "user_id"),
+        Index("ix_todo_user_id_public", "user_id", "public"),
+        Index("ix_todo_public", "public"),
+        # ranked leaderboard of /todos/best, only holds eligible todos
+        Index(
+            "ix_todo_best",
+            "public",
+            avg_stars.desc(),
+            "id",
+            sqlite_where=and_(public == True, avg_stars != None)
+        ),
+    )
+
+    def apply_review(self, count, stars):
+        """
+        Incrementally update the review aggregates by the given deltas,
+        avg_stars is derived from the updated count and sum
+        """
+
+        self.review_count = Todo.review_count + count
+        self.stars_sum = Todo.stars_sum + stars
+        self.avg_stars = (Todo.stars_sum + stars) * 1.0 / func.nullif(
+            Todo.review_count + count, 0
+        )
+
+    def refresh_review_aggregates(self):
+        """
+        Recount the review aggregates after a review update or delete,
+        avg_stars is derived from the recounted count and sum
+        """
+
+        reviews = db.session.query(Review).filter(Review.todo_id == Todo.id)
+        review_count = reviews.with_entities(
+            func.count(Review.id)
+        ).scalar_subquery()
+        stars_sum = reviews.with_entities(
+            func.coalesce(func.sum(Review.stars), 0)
+        ).scalar_subquery()
+        db.session.query(Todo).filter(
+            Todo.id == self.id
+        ).update({
+            Todo.review_count: review_count,
+            Todo.stars_sum: stars_sum,
+            Todo.avg_stars: stars_sum * 1.0 / func.nullif(review_count, 0)
+        }, synchronize_session=False)
+
+    def reserve_items(self, items):
         """
-        Returns average stars for the current instance
+        Count the given new items in with a single conditional UPDATE,
+        returns False (counting nothing) if they would exceed the cap
+        Concurrent writers are serialized by the database,
+        so the cap holds without a prior count
         """
 
-        return func.avg(Review.stars)
+        count = len(items)
+        completed = len([item for item in items if item.completed])
+        return db.session.query(Todo).filter(
+            Todo.id == self.id,
+            Todo.item_count + count <= TODO_MAX_ITEMS
+        ).update({
+            Todo.item_count: Todo.item_count + count,
+            Todo.completed_count: Todo.completed_count + completed
+        }, synchronize_session=False) == 1
+
+    def refresh_item_counts(self):
+        """
+        Recount the todo items after an update or delete of its items
+        """
+
+        items = db.session.query(Item).filter(Item.todo_id == Todo.id)
+        db.session.query(Todo).filter(
+            Todo.id == self.id
+        ).update({
+            Todo.item_count: items.with_entities(
+                func.count(Item.id)
+            ).scalar_subquery(),
+            Todo.completed_count: items.filter(
+                Item.completed == True
+            ).with_entities(
+                func.count(Item.id)
+            ).scalar_subquery()
+        }, synchronize_session=False)
 
     @staticmethod
-    def best(offset=0, limit=100):
+    def best(offset=0, limit=100, cursor=None):
         """
-        Fetches the list of best todos sorted by rating desc
+        Fetches the list of best todos sorted by rating desc,
+        the cursor is the (avg_stars, id) pair of the last seen todo
+        Reads walk the ix_todo_best leaderboard index in order,
+        so its filter and ordering must keep matching the index
         """
         
         todos = db.session.query(Todo).filter(
             Todo.public==True,
             Todo.avg_stars!=None
-        ).order_by(
-            Todo.avg_stars.desc()
+        )
+        if cursor:
+            stars, todo_id = cursor
+            todos = todos.filter(
+                # redundant bound the index can seek to, the OR alone
+                # would walk the leaderboard from its top
+                Todo.avg_stars <= stars,
+                or_(
+                    Todo.avg_stars < stars,
+                    and_(
+                        Todo.avg_stars == stars,
+                        Todo.id > todo_id
+                    )
+                )
+            )
+        return todos.order_by(
+            Todo.avg_stars.desc(),
+            Todo.id
         ).offset(offset).limit(limit)
-        return todos
 
     @staticmethod
-    def get_all_public_or_by_user(user, offset, limit):
+    def get_all_public_or_by_user(user, offset, limit, cursor=None):
         """
         Fetches all created by user or public todos
         """
         
-        return db.session.query(Todo).filter(
+        todos = db.session.query(Todo).filter(
             or_(
-                Todo.public,
-                Todo.owner == user
+                unindexed(Todo.public) == True,
+                unindexed(Todo.user_id) == user.id
             )
-        ).offset(offset).limit(limit)
+        )
+        return paginate(todos, Todo.id, offset, limit, cursor)
 
     @staticmethod
     def get_single_public_or_by_user(user, todo_id):
@@ -275,6 +543,27 @@ class Todo(db.Model):
             Todo.public == True
         ).first()
 
+    @staticmethod
+    def search(text, user=None, offset=0, limit=100):
+        """
+        Fetches the public (or created by user) todos whose title
+        or items match text, most relevant first
+        """
+
+        todos = db.session.query(Todo).join(
+            todo_fts, todo_fts.c.rowid == Todo.id
+        ).filter(
+            match(todo_fts, text)
+        )
+        if user:
+            todos = todos.filter(or_(Todo.public, Todo.owner == user))
+        else:
+            todos = todos.filter(Todo.public == True)
+        return todos.order_by(
+            rank(todo_fts, TODO_FTS_WEIGHTS),
+            Todo.id
+        ).offset(offset).limit(limit)
+
     @staticmethod
     def create(user, data):
         """
@@ -291,28 +580,82 @@ class Todo(db.Model):
         return todo
     
     @staticmethod
-    def get_all(offset=0, limit=100):
+    def import_many(user, data):
+        """
+        Create todos with their items using two multi-row inserts,
+        returns the number of created items
+        """
+
+        created = datetime.now()
+        # index the whole chunk at once rather than row by row
+        defer_todo_documents(db.session)
+        db.session.execute(
+            Todo.__table__.insert(),
+            [
+                {
+                    "user_id": user.id,
+                    "title": todo.title,
+                    "public": todo.public,
+                    "created": created,
+                    "review_count": 0,
+                    "stars_sum": 0,
+                    "item_count": len(todo.items),
+                    "completed_count": len([
+                        item for item in todo.items if item.completed
+                    ])
+                }
+                for todo in data
+            ]
+        )
+        # the insert holds the write lock, so the newest rows are ours
+        ids = db.session.query(Todo.id).filter(
+            Todo.user_id == user.id
+        ).order_by(Todo.id.desc()).limit(len(data))
+        ids = [todo_id for todo_id, in ids][::-1]
+        items = [
+            {
+                "todo_id": todo_id,
+                "content": item.content,
+                "completed": item.completed,
+                "created": created
+            }
+            for todo_id, todo in zip(ids, data)
+            for item in todo.items
+        ]
+        if items:
+            db.session.execute(Item.__table__.insert(), items)
+        rebuild_todo_documents(db.session, ids)
+        return len(items)
+
+    @staticmethod
+    def get_all(offset=0, limit=100, cursor=None):
         """
         Fetch all todos
         """
 
-        return db.session.query(Todo).offset(offset).limit(limit)
+        return paginate(db.session.query(Todo), Todo.id, offset, limit, cursor)
 
     @staticmethod
-    def get_all_public(offset=0, limit=100):
+    def get_all_public(offset=0, limit=100, cursor=None):
         """
         Fetch all public todos
         """
 
-        return db.session.query(Todo).filter_by(public=True).offset(offset).limit(limit)
+        return paginate(
+            db.session.query(Todo).filter_by(public=True),
+            Todo.id, offset, limit, cursor
+        )
 
     @staticmethod
-    def get_all_private(offset=0, limit=100):
+    def get_all_private(offset=0, limit=100, cursor=None):
         """
         Fetch all private todos
         """
 
-        return db.session.query(Todo).filter_by(public=False).offset(offset).limit(limit)
+        return paginate(
+            db.session.query(Todo).filter_by(public=False),
+            Todo.id, offset, limit, cursor
+        )
 
     @staticmethod
     def get_by_id(todo_id):
@@ -336,30 +679,75 @@ class Todo(db.Model):
             "updated": self.updated
         }
 
-    def get_info(self):
+    @staticmethod
+    def info_columns():
+        """
+        Columns read by row_info, for column-tuple queries
+        """
+
+        return (
+            Todo.id,
+            Todo.user_id,
+            Todo.title,
+            Todo.public,
+            Todo.created,
+            Todo.updated,
+            Todo.avg_stars,
+            Todo.review_count,
+            Todo.item_count,
+            Todo.completed_count
+        )
+
+    @staticmethod
+    def row_info(row, base_url):
         """
-        Get entry info
+        Get entry info from an instance or a column-tuple row
         """
 
         return {
-            "id": self.id,
-            "user_id": self.user_id,
-            "title": self.title,
-            "public": self.public,
-            "created": self.created,
-            "updated": self.updated,
-            "avg_rating": self.avg_stars,
-            "votes": self.reviews.count(),  # TODO: update votes count (too much time)
-            "link": current_app.config["BASE_URL"] + f"/todos/{self.id}"
+            "id": row.id,
+            "user_id": row.user_id,
+            "title": row.title,
+            "public": row.public,
+            "created": row.created,
+            "updated": row.updated,
+            "avg_rating": row.avg_stars,
+            "votes": row.review_count,
+            "progress": {
+                "items": row.item_count,
+                "completed": row.completed_count
+            },
+            "link": base_url + f"/todos/{row.id}"
         }
 
-    def is_full(self):
+    def get_info(self):
         """
-        Returns True if todo contains 100+ items,
-        otherwise returns false
+        Get entry info
         """
-        
-        return self.items.count() >= 100
+
+        return Todo.row_info(self, current_app.config["BASE_URL"])
+
+    @staticmethod
+    def expand(todos, fields):
+        """
+        Batch load the related collections of the given todos,
+        one IN query per expanded relationship
+        Returns {todo_id: {"items": [...], "reviews": [...]}}
+        """
+
+        expanded = {todo.id: {field: list() for field in fields} for todo in todos}
+        if not expanded:
+            return expanded
+        related = {"items": Item, "reviews": Review}
+        base_url = current_app.config["BASE_URL"]
+        for field in fields:
+            model = related[field]
+            rows = db.session.query(*model.info_columns()).filter(
+                model.todo_id.in_(list(expanded))
+            ).order_by(model.id)
+            for row in to_records(model, rows):
+                expanded[row.todo_id][field].append(model.row_info(row, base_url))
+        return expanded
 
     def update(self, data):
         """
@@ -370,12 +758,12 @@ class Todo(db.Model):
         self.public = data.public
         self.updated = datetime.now()
 
-    def get_items(self, offset=0, limit=100):
+    def get_items(self, offset=0, limit=100, cursor=None):
         """
         Fetch todo items
         """
 
-        return self.items.offset(offset).limit(limit)
+        return paginate(self.items, Item.id, offset, limit, cursor)
 
     def get_item_by_id(self, item_id):
         """
@@ -386,7 +774,7 @@ class Todo(db.Model):
 
     def add_item(self, data):
         """
-        Add item
+        Add item (counted in by reserve_items beforehand)
         """
         
         item = Item(
@@ -398,6 +786,30 @@ class Todo(db.Model):
         db.session.add(item)
         return item
 
+    def add_items(self, data):
+        """
+        Add items with a single multi-row insert
+        (counted in by reserve_items beforehand),
+        returns the created items
+        """
+
+        created = datetime.now()
+        db.session.execute(
+            Item.__table__.insert(),
+            [
+                {
+                    "todo_id": self.id,
+                    "content": item.content,
+                    "completed": item.completed,
+                    "created": created
+                }
+                for item in data.items
+            ]
+        )
+        # the insert holds the write lock, so the newest rows are ours
+        items = self.items.order_by(Item.id.desc()).limit(len(data.items))
+        return list(reversed(items.all()))
+
     def add_review(self, data, user):
         """
         Create a new todo review
@@ -405,12 +817,12 @@ class Todo(db.Model):
         review = Review.create(self, user, data)
         return review
 
-    def get_reviews(self, offset=0, limit=100):
+    def get_reviews(self, offset=0, limit=100, cursor=None):
         """
         Fetch todo reviews
         """
 
-        return self.reviews.offset(offset).limit(limit)
+        return paginate(self.reviews, Review.id, offset, limit, cursor)
 
     def get_review_by_user(self, user):
         """
@@ -419,12 +831,47 @@ class Todo(db.Model):
 
         return self.reviews.filter(Review.user_id==user.id).first()
     
-    def delete_items(self):
+    def filter_items(self, data):
+        """
+        Fetch todo items matching an ID list and/or a completed predicate
+        """
+
+        items = self.items
+        if data.ids is not None:
+            items = items.filter(Item.id.in_(data.ids))
+        if data.completed is not None:
+            items = items.filter(Item.completed == data.completed)
+        return items
+
+    def update_items(self, data):
+        """
+        Update matching todo items with a single UPDATE,
+        returns the number of updated items
+        """
+
+        values = {Item.updated: datetime.now()}
+        if data.set.content is not None:
+            values[Item.content] = data.set.content
+        if data.set.completed is not None:
+            values[Item.completed] = data.set.completed
+        count = self.filter_items(data.filter).update(
+            values, synchronize_session=False
+        )
+        if data.set.completed is not None:
+            self.refresh_item_counts()
+        return count
+
+    def delete_items(self, data=None):
         """
-        Delete todo items
+        Delete todo items (only the matching ones if a filter is given),
+        returns the number of deleted items
         """
 
-        self.items.delete()
+        if data is None:
+            return self.items.delete()
+        count = self.filter_items(data.filter).delete(synchronize_session=False)
+        self.refresh_item_counts()
+        return count
 
     def delete_reviews(self):
         """
@@ -432,6 +879,9 @@ class Todo(db.Model):
         """
         
         self.reviews.delete()
+        self.review_count = 0
+        self.stars_sum = 0
+        self.avg_stars = None
 
     def delete(self):
         """
@@ -454,28 +904,17 @@ class Item(db.Model):
     created = Column(DateTime, default=None)
     updated = Column(DateTime, default=None)
 
+    __table_args__ = (
+        Index("ix_item_todo_id", "todo_id"),
+    )
+
     @staticmethod
-    def create(todo, data):
-        """
-        Create a new todo item
-        """
-        
-        item = Item(
-            todo_id=todo.id,
-            content=data.content,
-            completed=data.completed,
-            created=datetime.now()
-        )
-        todo.items.append(item)
-        return item
-    
-    @staticmethod
-    def get_all(offset=0, limit=100):
+    def get_all(offset=0, limit=100, cursor=None):
         """
         Fetch all items
         """
 
-        return db.session.query(Item).offset(offset).limit(limit)
+        return paginate(db.session.query(Item), Item.id, offset, limit, cursor)
 
     @staticmethod
     def get_by_id(item_id):
@@ -499,36 +938,77 @@ class Item(db.Model):
             "updated": self.updated
         }
 
-    def get_info(self):
+    @staticmethod
+    def info_columns():
         """
-        Get entry info
+        Columns read by row_info, for column-tuple queries
+        """
+
+        return (
+            Item.id,
+            Item.todo_id,
+            Item.content,
+            Item.completed,
+            Item.created,
+            Item.updated
+        )
+
+    @staticmethod
+    def row_info(row, base_url):
+        """
+        Get entry info from an instance or a column-tuple row
         """
 
         return {
-            "id": self.id,
-            "todo_id": self.todo_id,
-            "content": self.content,
-            "completed": self.completed,
-            "created": self.created,
-            "updated": self.updated,
-            "link": current_app.config["BASE_URL"] + f"/todos/{self.todo_id}/items/{self.id}"
+            "id": row.id,
+            "todo_id": row.todo_id,
+            "content": row.content,
+            "completed": row.completed,
+            "created": row.created,
+            "updated": row.updated,
+            "link": base_url + f"/todos/{row.todo_id}/items/{row.id}"
         }
 
+    def get_info(self):
+        """
+        Get entry info
+        """
+
+        return Item.row_info(self, current_app.config["BASE_URL"])
+
     def update(self, data):
         """
-        Update current entry
+        Update current entry with a single UPDATE,
+        returns False if it no longer exists
+        The todo counts are recounted rather than adjusted,
+        the completed state loaded by this request may be stale
         """
 
-        self.content = data.content
-        self.completed = data.completed
-        self.updated = datetime.now()
+        updated = db.session.query(Item).filter(
+            Item.id == self.id,
+            Item.todo_id == self.todo_id
+        ).update({
+            Item.content: data.content,
+            Item.completed: data.completed,
+            Item.updated: datetime.now()
+        }, synchronize_session=False) == 1
+        if updated:
+            self.todo.refresh_item_counts()
+        return updated
 
     def delete(self):
         """
-        Delete current instance
+        Delete current instance with a single DELETE,
+        returns False if it was already deleted
         """
         
-        db.session.delete(self)
+        deleted = db.session.query(Item).filter(
+            Item.id == self.id,
+            Item.todo_id == self.todo_id
+        ).delete(synchronize_session=False) == 1
+        if deleted:
+            self.todo.refresh_item_counts()
+        return deleted
 
 
 class Review(db.Model):
@@ -544,14 +1024,20 @@ class Review(db.Model):
     created = Column(DateTime, default=None)
     updated = Column(DateTime, default=None)
 
+    __table_args__ = (
+        Index("ix_review_todo_id", "todo_id"),
+        # pages of a user reviews, read in id order
+        Index("ix_review_user_id", "user_id"),
+        Index("ix_review_user_id_todo_id", "user_id", "todo_id"),
+    )
 
     @staticmethod
-    def get_all(offset=0, limit=100):
+    def get_all(offset=0, limit=100, cursor=None):
         """
         Fetch all reviews
         """
 
-        return db.session.query(Review).offset(offset).limit(limit)
+        return paginate(db.session.query(Review), Review.id, offset, limit, cursor)
 
     @staticmethod
     def get_by_id(review_id):
@@ -562,32 +1048,27 @@ class Review(db.Model):
         return db.session.query(Review).filter_by(id=review_id).first()
 
     @staticmethod
-    def get_all_public(offset, limit):
+    def get_all_public(offset, limit, cursor=None):
         """
         Fetch all reviews belonging to public todos
         """
 
-        return Review.query.join(
-            Review.todo, aliased=True
-        ).filter(
-            Todo.public == True
-        ).offset(offset).limit(limit)
+        reviews = db.session.query(Review).filter(
+            visible_todo(Review.todo_id)
+        )
+        return paginate(reviews, Review.id, offset, limit, cursor)
 
     @staticmethod
-    def get_all_public_or_by_user(user, offset, limit):
+    def get_all_public_or_by_user(user, offset, limit, cursor=None):
         """
         Fetch all reviews belonging to public todos
         or todos that are owned by user
         """
 
-        return Review.query.join(
-            Review.todo, aliased=True
-        ).filter(
-            or_(
-                Todo.public == True,
-                Todo.owner == user
-            )
-        ).offset(offset).limit(limit)
+        reviews = db.session.query(Review).filter(
+            visible_todo(Review.todo_id, user)
+        )
+        return paginate(reviews, Review.id, offset, limit, cursor)
 
     @staticmethod
     def get_single_public(review_id):
@@ -620,6 +1101,29 @@ class Review(db.Model):
             )
         ).first()
 
+    @staticmethod
+    def search(text, user=None, offset=0, limit=100):
+        """
+        Fetch the reviews matching text that belong to public todos
+        (or todos owned by user), most relevant first
+        """
+
+        reviews = db.session.query(Review).join(
+            review_fts, review_fts.c.rowid == Review.id
+        ).join(
+            Todo, Review.todo_id == Todo.id
+        ).filter(
+            match(review_fts, text)
+        )
+        if user:
+            reviews = reviews.filter(or_(Todo.public == True, Todo.owner == user))
+        else:
+            reviews = reviews.filter(Todo.public == True)
+        return reviews.order_by(
+            rank(review_fts, REVIEW_FTS_WEIGHTS),
+            Review.id
+        ).offset(offset).limit(limit)
+
     def to_dict(self):
         """
         Get instance dictionary
@@ -651,38 +1155,82 @@ class Review(db.Model):
         )
         todo.reviews.append(review)
         user.reviews.append(review)
+        todo.apply_review(1, review.stars)
         return review
 
-    def get_info(self):
+    @staticmethod
+    def info_columns():
         """
-        Get entry info
+        Columns read by row_info, for column-tuple queries
+        """
+
+        return (
+            Review.id,
+            Review.user_id,
+            Review.todo_id,
+            Review.title,
+            Review.content,
+            Review.stars,
+            Review.created,
+            Review.updated
+        )
+
+    @staticmethod
+    def row_info(row, base_url):
+        """
+        Get entry info from an instance or a column-tuple row
         """
 
         return {
-            "id": self.id,
-            "user_id": self.user_id,
-            "todo_id": self.todo_id,
-            "title": self.title,
-            "content": self.content,
-            "stars": self.stars,
-            "created": self.created,
-            "updated": self.updated,
-            "link": current_app.config["BASE_URL"] + f"/reviews/{self.id}"
+            "id": row.id,
+            "user_id": row.user_id,
+            "todo_id": row.todo_id,
+            "title": row.title,
+            "content": row.content,
+            "stars": row.stars,
+            "created": row.created,
+            "updated": row.updated,
+            "link": base_url + f"/reviews/{row.id}"
         }
 
-    def update(self, data):
+    def get_info(self):
         """
-        Update current entry
+        Get entry info
         """
 
-        self.title = data.title
-        self.content = data.content
-        self.stars = data.stars
-        self.updated = datetime.now()
+        return Review.row_info(self, current_app.config["BASE_URL"])
+
+    def update(self, data):
+        """
+        Update current entry with a single UPDATE,
+        returns False if it no longer exists
+        The todo aggregates are recounted rather than adjusted,
+        the stars loaded by this request may be stale
+        """
+
+        updated = db.session.query(Review).filter(
+            Review.id == self.id,
+            Review.todo_id == self.todo_id
+        ).update({
+            Review.title: data.title,
+            Review.content: data.content,
+            Review.stars: data.stars,
+            Review.updated: datetime.now()
+        }, synchronize_session=False) == 1
+        if updated:
+            self.todo.refresh_review_aggregates()
+        return updated
 
     def delete(self):
         """
-        Delete current instance
+        Delete current instance with a single DELETE,
+        returns False if it was already deleted
         """
 
-        db.session.delete(self)
+        deleted = db.session.query(Review).filter(
+            Review.id == self.id,
+            Review.todo_id == self.todo_id
+        ).delete(synchronize_session=False) == 1
+        if deleted:
+            self.todo.refresh_review_aggregates()
+        return deleted
@@ -0,0 +1,194 @@
+import sqlite3
+from threading import local
+from time import time
+from flask import current_app, request
+from flask_limiter.util import get_remote_address
+from limits import parse_many
+from limits.storage import Storage
+from limits.strategies import STRATEGIES, FixedWindowRateLimiter
+from werkzeug.exceptions import HTTPException, TooManyRequests
+from core.cache import TTLCache
+
+
+class SQLiteStorage(Storage):
+    """
+    Fixed window rate limit counters kept in a sqlite file,
+    shared by every worker process of the host
+    (RATELIMIT_STORAGE_URL = "sqlite:///relative.db" or "sqlite:////absolute.db")
+    """
+
+    STORAGE_SCHEME = ["sqlite"]
+    PURGE_INTERVAL = 1000
+
+    def __init__(self, uri, **options):
+        super().__init__(uri, **options)
+        self.path = uri.split("://", 1)[1][1:]
+        self.timeout = options.get("timeout", 5)
+        self.increments = 0
+        self._local = local()
+        self.connection().execute(
+            "CREATE TABLE IF NOT EXISTS ratelimit ("
+            "key TEXT PRIMARY KEY, count INTEGER NOT NULL, expiry REAL NOT NULL)"
+        )
+
+    def connection(self):
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(
+                self.path, timeout=self.timeout, isolation_level=None
+            )
+            # counters are disposable, durability is not needed
+            connection.execute("PRAGMA journal_mode=wal")
+            connection.execute("PRAGMA synchronous=off")
+            self._local.connection = connection
+        return connection
+
+    def incr(self, key, expiry, elastic_expiry=False, amount=1):
+        """
+        Increments the counter of key by amount, starting a new window
+        of expiry seconds when the current one is over
+        """
+
+        now = time()
+        connection = self.connection()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            connection.execute(
+                "INSERT INTO ratelimit (key, count, expiry) VALUES (:key, :amount, :expiry) "
+                "ON CONFLICT (key) DO UPDATE SET "
+                "count = CASE WHEN expiry <= :now THEN :amount ELSE count + :amount END, "
+                "expiry = CASE WHEN expiry <= :now OR :elastic THEN :expiry ELSE expiry END",
+                {
+                    "key": key,
+                    "amount": amount,
+                    "expiry": now + expiry,
+                    "now": now,
+                    "elastic": elastic_expiry
+                }
+            )
+            count, = connection.execute(
+                "SELECT count FROM ratelimit WHERE key = ?", (key,)
+            ).fetchone()
+            connection.execute("COMMIT")
+        except Exception:
+            connection.execute("ROLLBACK")
+            raise
+        self.increments += 1
+        if self.increments % self.PURGE_INTERVAL == 0:
+            connection.execute("DELETE FROM ratelimit WHERE expiry <= ?", (now,))
+        return count
+
+    def get(self, key):
+        row = self.connection().execute(
+            "SELECT count FROM ratelimit WHERE key = ? AND expiry > ?", (key, time())
+        ).fetchone()
+        return row[0] if row else 0
+
+    def get_expiry(self, key):
+        row = self.connection().execute(
+            "SELECT expiry FROM ratelimit WHERE key = ?", (key,)
+        ).fetchone()
+        return int(row[0]) if row else -1
+
+    def check(self):
+        try:
+            self.connection().execute("SELECT 1")
+            return True
+        except sqlite3.Error:
+            return False
+
+    def reset(self):
+        return self.connection().execute("DELETE FROM ratelimit").rowcount
+
+    def clear(self, key):
+        self.connection().execute("DELETE FROM ratelimit WHERE key = ?", (key,))
+
+
+class PrecheckRateLimiter(FixedWindowRateLimiter):
+    """
+    Fixed window strategy remembering in process the keys found
+    over their limit until their window resets, so that rejected
+    clients are answered without a round trip to the shared storage
+    (RATELIMIT_STRATEGY = "fixed-window-precheck")
+    """
+
+    def __init__(self, storage):
+        super().__init__(storage)
+        self.rejected = TTLCache(maxsize=100000)
+
+    def hit(self, item, *identifiers, cost=1):
+        key = item.key_for(*identifiers)
+        if self.rejected.get(key):
+            return False
+        storage = self.storage()
+        if isinstance(storage, SQLiteStorage):
+            count = storage.incr(key, item.get_expiry(), amount=cost)
+        else:
+            for _ in range(cost):
+                count = storage.incr(key, item.get_expiry())
+        if count <= item.amount:
+            return True
+        self.rejected.set(key, True, storage.get_expiry(key) - time())
+        return False
+
+    def test(self, item, *identifiers):
+        if self.rejected.get(item.key_for(*identifiers)):
+            return False
+        return super().test(item, *identifiers)
+
+
+STRATEGIES["fixed-window-precheck"] = PrecheckRateLimiter
+
+
+def client_key():
+    """
+    Rate limit key of the request, the token uid when a valid bearer
+    is sent (users behind one address get their own budget),
+    the remote address otherwise
+    """
+    from core.decorators import decode_bearer
+
+    auth_header = request.headers.get("Authorization")
+    if auth_header:
+        try:
+            return f"uid:{decode_bearer(auth_header)['uid']}"
+        except (HTTPException, KeyError):
+            pass
+    return get_remote_address()
+
+def request_cost():
+    """
+    Cost of the request in RATELIMIT_COSTS, looked up by endpoint
+    then by method (defaults to 1)
+    """
+
+    costs = current_app.config.get("RATELIMIT_COSTS", {})
+    return costs.get(request.endpoint, costs.get(request.method, 1))
+
+def hit(strategy, item, cost, *identifiers):
+    if isinstance(strategy, PrecheckRateLimiter):
+        return strategy.hit(item, *identifiers, cost=cost)
+    return all(strategy.hit(item, *identifiers) for _ in range(cost))
+
+def check_rate_limits():
+    """
+    Count the request against the RATELIMIT_ROUTES limit of its
+    endpoint, if any, then charge its cost to the client budget
+    (DEFAULT_RATELIMIT, shared by every limited route)
+    Requests rejected by the route limit are not charged,
+    so retrying a limited route does not drain the budget
+    """
+
+    limiter = current_app.extensions.get("limiter")
+    if not limiter or not limiter.enabled:
+        return
+    config = current_app.config
+    key = client_key()
+    route_limit = config.get("RATELIMIT_ROUTES", {}).get(request.endpoint)
+    if route_limit:
+        for item in parse_many(route_limit):
+            if not hit(limiter.limiter, item, 1, key, request.endpoint):
+                raise TooManyRequests(description=f"rate limit exceeded ({item})")
+    for item in parse_many(";".join(config["DEFAULT_RATELIMIT"])):
+        if not hit(limiter.limiter, item, request_cost(), key, "budget"):
+            raise TooManyRequests(description=f"rate limit exceeded ({item})")
@@ -0,0 +1,85 @@
+from flask import g, has_request_context, request
+from flask_sqlalchemy import SQLAlchemy, SignallingSession, get_state
+from sqlalchemy import orm
+from core.cache import TTLCache
+
+
+READ_BIND = "read"
+READ_METHODS = ("GET", "HEAD")
+
+
+class RoutingSession(SignallingSession):
+    """
+    Session sending the statements of read-only requests
+    to the read bind, everything else to the primary
+    """
+
+    def get_bind(self, mapper=None, clause=None):
+        db = get_state(self.app).db
+        if not self._flushing and db.use_read_bind():
+            return db.get_engine(self.app, bind=READ_BIND)
+        return SignallingSession.get_bind(self, mapper, clause)
+
+class RoutingSQLAlchemy(SQLAlchemy):
+    """
+    SQLAlchemy extension with an optional read bind
+    (SQLALCHEMY_READ_DATABASE_URI) serving GET requests,
+    users are pinned to the primary for PRIMARY_PIN_TTL
+    seconds after a successful write
+    """
+
+    def __init__(self, *args, **kwargs) -> None:
+        self.pins = TTLCache()
+        super().__init__(*args, **kwargs)
+
+    def init_app(self, app):
+        read_uri = app.config.get("SQLALCHEMY_READ_DATABASE_URI")
+        if read_uri:
+            binds = dict(app.config.get("SQLALCHEMY_BINDS") or {})
+            binds[READ_BIND] = read_uri
+            app.config["SQLALCHEMY_BINDS"] = binds
+        super().init_app(app)
+        self.pins.init_app(app, "PRIMARY_PIN")
+        app.after_request(self.pin_writer)
+
+    def create_session(self, options):
+        return orm.sessionmaker(class_=RoutingSession, db=self, **options)
+
+    def has_read_bind(self, app=None):
+        """
+        Returns True if a read bind is configured
+        """
+
+        app = self.get_app(app)
+        return READ_BIND in (app.config.get("SQLALCHEMY_BINDS") or {})
+
+    def engines(self, app=None):
+        """
+        Returns the primary engine followed by the read engine, if any
+        """
+
+        app = self.get_app(app)
+        engines = [self.get_engine(app)]
+        if self.has_read_bind(app):
+            engines.append(self.get_engine(app, bind=READ_BIND))
+        return engines
+
+    def use_read_bind(self):
+        """
+        Returns True if the current request may read from the read bind
+        """
+
+        if not has_request_context() or request.method not in READ_METHODS:
+            return False
+        if not self.has_read_bind():
+            return False
+        user_id = g.get("user_id")
+        return user_id is None or self.pins.get(user_id) is None
+
+    def pin_writer(self, response):
+        # read-your-writes, the pins are per process
+        user_id = g.get("user_id")
+        if user_id is not None and request.method not in READ_METHODS \
+            and response.status_code < 400:
+            self.pins.set(user_id, True)
+        return response
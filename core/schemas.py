@@ -21,6 +21,8 @@ TODO_TITLE_MAXLEN = 50
 ITEM_CONTENT_MINLEN = 1
 ITEM_CONTENT_MAXLEN = 50
 
+TODO_MAX_ITEMS = 100
+
 REVIEW_TITLE_MINLEN = 1
 REVIEW_TITLE_MAXLEN = 50
 
@@ -32,9 +34,62 @@ MAX_OFFSET = 999999999
 
 MIN_LIMIT = 1
 MAX_LIMIT = 100
+STREAM_MAX_LIMIT = 5000
+STREAM_BATCH_SIZE = 500
+
+IMPORT_CHUNK_SIZE = 1000
+
+SEARCH_QUERY_MINLEN = 1
+SEARCH_QUERY_MAXLEN = 100
+
+MAX_CURSOR_LEN = 200
+MIN_CURSOR_KEYS = 1
+MAX_CURSOR_KEYS = 2
+# keys are bound as SQLite integers (signed 64-bit) or reals
+MIN_CURSOR_INT = -2**63
+MAX_CURSOR_INT = 2**63 - 1
 
 
 # FUNCTIONS #
+import base64
+import binascii
+import json
+import math
+
+
+def encode_cursor(key):
+    """
+    Generate an opaque pagination cursor from the last seen sort key
+    """
+    raw = json.dumps(list(key), separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def is_cursor_key(key):
+    """
+    True for the sort key values SQLite can bind
+    """
+    if isinstance(key, bool):
+        return False
+    if isinstance(key, int):
+        return MIN_CURSOR_INT <= key <= MAX_CURSOR_INT
+    return isinstance(key, float) and math.isfinite(key)
+
+def decode_cursor(cursor):
+    """
+    Parse an opaque pagination cursor back into a sort key,
+    raises ValueError if the cursor is malformed
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        key = json.loads(raw)
+    except (binascii.Error, ValueError):
+        raise ValueError("invalid cursor")
+    if not isinstance(key, list) \
+        or not MIN_CURSOR_KEYS <= len(key) <= MAX_CURSOR_KEYS \
+        or not all(is_cursor_key(k) for k in key):
+        raise ValueError("invalid cursor")
+    return tuple(key)
+
 def errors_to_dict(errs):
     """
     Generate dictionary from pydantic errors
@@ -57,8 +112,9 @@ def errors_to_response(errors):
 
 
 # SCHEMAS #
-from enum import IntEnum
-from pydantic import BaseModel, Field
+from enum import Enum, IntEnum
+from typing import List, Optional
+from pydantic import BaseModel, Field, root_validator, validator
 
 
 class ReviewStarsEnum(IntEnum):
@@ -68,6 +124,10 @@ class ReviewStarsEnum(IntEnum):
     four=4
     five=5
 
+class ExpandEnum(str, Enum):
+    items="items"
+    reviews="reviews"
+
 class CredentialsShema(BaseModel):
     """
     Parse and validate credentials schema
@@ -118,6 +178,16 @@ class CreateItemSchema(BaseModel):
         )
     completed: bool = Field(...) # is required
 
+class CreateItemsBatchSchema(BaseModel):
+    """
+    Parse and validate Create Todo Items batch schema
+    """
+    items: List[CreateItemSchema] = Field(
+        ..., # is required
+        min_items=1,
+        max_items=TODO_MAX_ITEMS
+        )
+
 class UpdateItemSchema(BaseModel):
     """
     Parse and validate Update Todo Item schema
@@ -129,6 +199,54 @@ class UpdateItemSchema(BaseModel):
         )
     completed: bool = Field(...) # is required
 
+class ItemsFilterSchema(BaseModel):
+    """
+    Parse and validate Todo Items filter schema
+    (an ID list and/or a completed predicate)
+    """
+    ids: Optional[List[int]] = Field(
+        None,
+        min_items=1,
+        max_items=TODO_MAX_ITEMS
+        )
+    completed: Optional[bool] = Field(None)
+
+    @root_validator
+    def require_predicate(cls, values):
+        if values.get("ids") is None and values.get("completed") is None:
+            raise ValueError("ids or completed is required")
+        return values
+
+class ItemsValuesSchema(BaseModel):
+    """
+    Parse and validate Todo Items new values schema
+    """
+    content: Optional[str] = Field(
+        None,
+        min_length=ITEM_CONTENT_MINLEN,
+        max_length=ITEM_CONTENT_MAXLEN
+        )
+    completed: Optional[bool] = Field(None)
+
+    @root_validator
+    def require_value(cls, values):
+        if values.get("content") is None and values.get("completed") is None:
+            raise ValueError("content or completed is required")
+        return values
+
+class UpdateItemsSchema(BaseModel):
+    """
+    Parse and validate Update Todo Items schema
+    """
+    filter: ItemsFilterSchema = Field(...) # is required
+    set: ItemsValuesSchema = Field(...) # is required
+
+class DeleteItemsSchema(BaseModel):
+    """
+    Parse and validate Delete Todo Items schema
+    """
+    filter: ItemsFilterSchema = Field(...) # is required
+
 class CreateTodoSchema(BaseModel):
     """
     Parse and validate Create Todo schema
@@ -140,6 +258,15 @@ class CreateTodoSchema(BaseModel):
         )
     public: bool = Field(...) # is required
 
+class ImportTodoSchema(CreateTodoSchema):
+    """
+    Parse and validate Import Todo schema (a todo with its items)
+    """
+    items: List[CreateItemSchema] = Field(
+        [],
+        max_items=TODO_MAX_ITEMS
+        )
+
 class UpdateTodoSchema(BaseModel):
     """
     Parse and validate Update Todo schema
@@ -196,4 +323,44 @@ class PaginationSchema(BaseModel):
         ..., # is required
         ge=MIN_LIMIT,
         le=MAX_LIMIT
-        )
\ No newline at end of file
+        )
+    cursor: Optional[tuple] = Field(None)
+
+    @validator("cursor", pre=True)
+    def parse_cursor(cls, v):
+        if v is None:
+            return v
+        if len(v) > MAX_CURSOR_LEN:
+            raise ValueError("invalid cursor")
+        return decode_cursor(v)
+
+class StreamPaginationSchema(PaginationSchema):
+    """
+    Parse and validate Pagination Required schema of streamed responses
+    """
+    limit: int = Field(
+        ..., # is required
+        ge=MIN_LIMIT,
+        le=STREAM_MAX_LIMIT
+        )
+class SearchSchema(BaseModel):
+    """
+    Parse and validate Search Required schema
+    """
+    q: str = Field(
+        ..., # is required
+        min_length=SEARCH_QUERY_MINLEN,
+        max_length=SEARCH_QUERY_MAXLEN
+        )
+
+    @validator("q")
+    def require_words(cls, v):
+        if not v.split():
+            raise ValueError("search query is empty")
+        return v
+
+class ExpandSchema(BaseModel):
+    """
+    Parse and validate Expand Optional schema
+    """
+    expand: List[ExpandEnum] = Field(...) # is required
@@ -0,0 +1,144 @@
+from sqlalchemy import DDL, bindparam, event, func, literal_column, table, column, text
+from core.app import database as db
+
+
+# one document per todo (its title and the content of its items),
+# rewritten by the triggers whenever one of them changes
+TODO_FTS_DOCUMENT = """
+    INSERT INTO todo_fts (rowid, title, items)
+    SELECT todo.id, todo.title, (
+        SELECT group_concat(item.content, ' ') FROM item
+        WHERE item.todo_id = todo.id
+    ) FROM todo WHERE todo.id = {todo_id};
+"""
+
+# the insert triggers are skipped while this table holds a row,
+# bulk writers rebuild the documents of their todos once instead
+TODO_FTS_DEFERRED = "NOT EXISTS (SELECT 1 FROM todo_fts_deferred)"
+
+FTS_CREATE = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS todo_fts USING fts5("
+    "title, items, tokenize = 'porter unicode61 remove_diacritics 2')",
+    # reviews are indexed in place (external content table)
+    "CREATE VIRTUAL TABLE IF NOT EXISTS review_fts USING fts5("
+    "title, content, content = 'review', content_rowid = 'id', "
+    "tokenize = 'porter unicode61 remove_diacritics 2')",
+    "CREATE TABLE IF NOT EXISTS todo_fts_deferred (id INTEGER PRIMARY KEY)",
+    "CREATE TRIGGER IF NOT EXISTS todo_fts_insert AFTER INSERT ON todo "
+    "WHEN " + TODO_FTS_DEFERRED + " BEGIN"
+    + TODO_FTS_DOCUMENT.format(todo_id="new.id") + "END",
+    "CREATE TRIGGER IF NOT EXISTS todo_fts_update AFTER UPDATE OF title ON todo BEGIN "
+    "DELETE FROM todo_fts WHERE rowid = old.id;"
+    + TODO_FTS_DOCUMENT.format(todo_id="new.id") + "END",
+    "CREATE TRIGGER IF NOT EXISTS todo_fts_delete AFTER DELETE ON todo BEGIN "
+    "DELETE FROM todo_fts WHERE rowid = old.id; END",
+    "CREATE TRIGGER IF NOT EXISTS item_fts_insert AFTER INSERT ON item "
+    "WHEN " + TODO_FTS_DEFERRED + " BEGIN "
+    # appended in place, cheaper than rebuilding the document
+    "UPDATE todo_fts SET items = coalesce(items || ' ', '') || new.content "
+    "WHERE rowid = new.todo_id; END",
+    "CREATE TRIGGER IF NOT EXISTS item_fts_update AFTER UPDATE OF content ON item BEGIN "
+    "DELETE FROM todo_fts WHERE rowid = new.todo_id;"
+    + TODO_FTS_DOCUMENT.format(todo_id="new.todo_id") + "END",
+    "CREATE TRIGGER IF NOT EXISTS item_fts_delete AFTER DELETE ON item BEGIN "
+    "DELETE FROM todo_fts WHERE rowid = old.todo_id;"
+    + TODO_FTS_DOCUMENT.format(todo_id="old.todo_id") + "END",
+    "CREATE TRIGGER IF NOT EXISTS review_fts_insert AFTER INSERT ON review BEGIN "
+    "INSERT INTO review_fts (rowid, title, content) "
+    "VALUES (new.id, new.title, new.content); END",
+    "CREATE TRIGGER IF NOT EXISTS review_fts_update AFTER UPDATE OF title, content ON review BEGIN "
+    "INSERT INTO review_fts (review_fts, rowid, title, content) "
+    "VALUES ('delete', old.id, old.title, old.content); "
+    "INSERT INTO review_fts (rowid, title, content) "
+    "VALUES (new.id, new.title, new.content); END",
+    "CREATE TRIGGER IF NOT EXISTS review_fts_delete AFTER DELETE ON review BEGIN "
+    "INSERT INTO review_fts (review_fts, rowid, title, content) "
+    "VALUES ('delete', old.id, old.title, old.content); END",
+)
+
+FTS_TABLES = ("todo_fts", "review_fts")
+
+FTS_DROP = (
+    "DROP TABLE IF EXISTS todo_fts",
+    "DROP TABLE IF EXISTS review_fts",
+    "DROP TABLE IF EXISTS todo_fts_deferred",
+)
+
+# bm25 column weights, title matches rank above body matches
+TODO_FTS_WEIGHTS = (4.0, 1.0)
+REVIEW_FTS_WEIGHTS = (4.0, 1.0)
+
+todo_fts = table("todo_fts", column("rowid"))
+todo_fts_deferred = table("todo_fts_deferred", column("id"))
+review_fts = table("review_fts", column("rowid"))
+
+def with_content_tables(ddl, target, bind, tables=None, **kw):
+    """
+    Only emit the DDL along with the indexed tables
+    (not for the binds create_all has nothing to create on)
+    """
+
+    return tables is None or any(table.name == "todo" for table in tables)
+
+# the indexes are built alongside the tables by create_all
+for statement in FTS_CREATE:
+    event.listen(db.metadata, "after_create", DDL(statement).execute_if(
+        dialect="sqlite", callable_=with_content_tables
+    ))
+for statement in FTS_DROP:
+    event.listen(db.metadata, "before_drop", DDL(statement).execute_if(
+        dialect="sqlite", callable_=with_content_tables
+    ))
+
+
+def is_search_table(name):
+    """
+    True for the FTS5 tables and their shadow tables (<name>_data, ...),
+    which are managed by FTS_CREATE rather than by the models
+    """
+
+    return any(name == table or name.startswith(table + "_") for table in FTS_TABLES)
+
+def defer_todo_documents(session):
+    """
+    Skip the todo_fts insert triggers until the end of the
+    current transaction (other connections are not affected)
+    """
+
+    session.execute(todo_fts_deferred.insert().values(id=1))
+
+def rebuild_todo_documents(session, todo_ids):
+    """
+    Index the todos created while the triggers were deferred,
+    in one statement, and resume the triggers
+    """
+
+    session.execute(
+        text(TODO_FTS_DOCUMENT.replace(
+            "todo.id = {todo_id}", "todo.id IN :todo_ids"
+        )).bindparams(bindparam("todo_ids", expanding=True)),
+        {"todo_ids": list(todo_ids)}
+    )
+    session.execute(todo_fts_deferred.delete())
+
+def match_query(text):
+    """
+    FTS5 query matching every word of text, quoted so that
+    user input can not use (or break) the query syntax
+    """
+
+    return " AND ".join('"' + word.replace('"', '""') + '"' for word in text.split())
+
+def match(fts, text):
+    """
+    Filter clause of the rows of fts matching text
+    """
+
+    return literal_column(fts.name).op("MATCH")(match_query(text))
+
+def rank(fts, weights):
+    """
+    bm25 relevance of the matched fts rows, lower is better
+    """
+
+    return func.bm25(literal_column(fts.name), *weights)
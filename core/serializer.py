@@ -0,0 +1,56 @@
+from datetime import date
+from flask import current_app, json
+from werkzeug.http import http_date
+
+
+def encode_default(value):
+    # same date format as the flask encoder
+    if isinstance(value, date):
+        return http_date(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+class JSONSerializer:
+    """
+    JSON encoder of the list endpoints, flask's encoder by default
+    or orjson with JSON_BACKEND = "orjson" (requires the optional
+    'orjson' package)
+    """
+
+    def __init__(self) -> None:
+        self.backend = "json"
+        self.orjson = None
+        self.options = 0
+
+    def init_app(self, app):
+        """
+        Read JSON_BACKEND and JSON_SORT_KEYS from the app config
+        """
+
+        self.backend = app.config.get("JSON_BACKEND", self.backend)
+        self.orjson = None
+        if self.backend == "orjson":
+            import orjson
+
+            self.orjson = orjson
+            # datetimes go through encode_default instead of RFC 3339
+            self.options = orjson.OPT_PASSTHROUGH_DATETIME
+            if app.config.get("JSON_SORT_KEYS", True):
+                self.options |= orjson.OPT_SORT_KEYS
+
+    def dumps(self, data) -> bytes:
+        """
+        Serialize data to JSON bytes
+        """
+
+        if self.orjson:
+            return self.orjson.dumps(data, default=encode_default, option=self.options)
+        return json.dumps(data).encode()
+
+    def response(self, data, status=200):
+        """
+        Build a JSON response
+        """
+
+        return current_app.response_class(
+            self.dumps(data), status=status, mimetype="application/json"
+        )
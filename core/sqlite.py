@@ -0,0 +1,39 @@
+from sqlalchemy import event
+from core.app import database
+
+
+def pragmas_listener(pragmas):
+    """
+    Returns a connect listener issuing the given pragmas
+    on every new DBAPI connection
+    """
+
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
+    return set_pragmas
+
+def apply_pragmas(engine, pragmas):
+    """
+    Issue the pragmas on each connection the engine opens,
+    ignored for other dialects
+    """
+
+    if pragmas and engine.dialect.name == "sqlite":
+        event.listen(engine, "connect", pragmas_listener(pragmas))
+
+def init_app(app):
+    """
+    Apply SQLITE_PRAGMAS to the app engines, must run
+    before the first connection is made,
+    connections of the read engine are also made query_only
+    """
+
+    pragmas = app.config.get("SQLITE_PRAGMAS") or {}
+    with app.app_context():
+        primary, *replicas = database.engines()
+        apply_pragmas(primary, pragmas)
+        for engine in replicas:
+            apply_pragmas(engine, dict(pragmas, query_only=1))
@@ -0,0 +1,26 @@
+"""user page indexes
+
+Revision ID: 3f6b0d8e52c1
+Revises: a5c81e3f9d27
+Create Date: 2026-10-17 05:02:18.114930
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f6b0d8e52c1'
+down_revision = 'a5c81e3f9d27'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_todo_user_id', 'todo', ['user_id'], unique=False)
+    op.create_index('ix_review_user_id', 'review', ['user_id'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_review_user_id', table_name='review')
+    op.drop_index('ix_todo_user_id', table_name='todo')
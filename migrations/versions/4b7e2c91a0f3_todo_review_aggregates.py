@@ -0,0 +1,49 @@
+"""todo review aggregates
+
+Revision ID: 4b7e2c91a0f3
+Revises: d1cfdb3da1d8
+Create Date: 2026-10-17 03:12:40.118204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '4b7e2c91a0f3'
+down_revision = 'd1cfdb3da1d8'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('todo') as batch_op:
+        batch_op.add_column(sa.Column('review_count', sa.Integer(), server_default='0', nullable=False))
+        batch_op.add_column(sa.Column('stars_sum', sa.Integer(), server_default='0', nullable=False))
+
+    # backfill the aggregates of existing todos
+    op.execute(
+        """
+        UPDATE todo SET
+            review_count = (
+                SELECT count(review.id) FROM review
+                WHERE review.todo_id = todo.id
+            ),
+            stars_sum = (
+                SELECT coalesce(sum(review.stars), 0) FROM review
+                WHERE review.todo_id = todo.id
+            )
+        """
+    )
+    op.execute(
+        """
+        UPDATE todo SET
+            avg_stars = stars_sum * 1.0 / nullif(review_count, 0)
+        """
+    )
+
+
+def downgrade():
+    with op.batch_alter_table('todo') as batch_op:
+        batch_op.drop_column('stars_sum')
+        batch_op.drop_column('review_count')
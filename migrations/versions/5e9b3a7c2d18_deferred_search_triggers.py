@@ -0,0 +1,51 @@
+"""deferred search triggers
+
+Revision ID: 5e9b3a7c2d18
+Revises: c27e94a1f05b
+Create Date: 2026-10-17 06:02:37.914205
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5e9b3a7c2d18'
+down_revision = 'c27e94a1f05b'
+branch_labels = None
+depends_on = None
+
+
+TODO_FTS_DOCUMENT = """
+    INSERT INTO todo_fts (rowid, title, items)
+    SELECT todo.id, todo.title, (
+        SELECT group_concat(item.content, ' ') FROM item
+        WHERE item.todo_id = todo.id
+    ) FROM todo WHERE todo.id = {todo_id};
+"""
+
+TODO_FTS_DEFERRED = "NOT EXISTS (SELECT 1 FROM todo_fts_deferred)"
+
+TRIGGERS = {
+    'todo_fts_insert': "AFTER INSERT ON todo {when}BEGIN"
+        + TODO_FTS_DOCUMENT.format(todo_id="new.id") + "END",
+    'item_fts_insert': "AFTER INSERT ON item {when}BEGIN "
+        "UPDATE todo_fts SET items = coalesce(items || ' ', '') || new.content "
+        "WHERE rowid = new.todo_id; END",
+}
+
+
+def upgrade():
+    op.execute("CREATE TABLE todo_fts_deferred (id INTEGER PRIMARY KEY)")
+    for name, body in TRIGGERS.items():
+        op.execute(f"DROP TRIGGER {name}")
+        op.execute(f"CREATE TRIGGER {name} " + body.format(
+            when="WHEN " + TODO_FTS_DEFERRED + " "
+        ))
+
+
+def downgrade():
+    for name, body in TRIGGERS.items():
+        op.execute(f"DROP TRIGGER {name}")
+        op.execute(f"CREATE TRIGGER {name} " + body.format(when=""))
+    op.execute("DROP TABLE todo_fts_deferred")
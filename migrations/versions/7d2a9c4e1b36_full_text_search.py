@@ -0,0 +1,80 @@
+"""full text search
+
+Revision ID: 7d2a9c4e1b36
+Revises: e81a4f6b2d05
+Create Date: 2026-10-17 04:05:12.307541
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7d2a9c4e1b36'
+down_revision = 'e81a4f6b2d05'
+branch_labels = None
+depends_on = None
+
+
+TODO_FTS_DOCUMENT = """
+    INSERT INTO todo_fts (rowid, title, items)
+    SELECT todo.id, todo.title, (
+        SELECT group_concat(item.content, ' ') FROM item
+        WHERE item.todo_id = todo.id
+    ) FROM todo WHERE todo.id = {todo_id};
+"""
+
+TRIGGERS = {
+    'todo_fts_insert': "AFTER INSERT ON todo BEGIN"
+        + TODO_FTS_DOCUMENT.format(todo_id="new.id") + "END",
+    'todo_fts_update': "AFTER UPDATE OF title ON todo BEGIN "
+        "DELETE FROM todo_fts WHERE rowid = old.id;"
+        + TODO_FTS_DOCUMENT.format(todo_id="new.id") + "END",
+    'todo_fts_delete': "AFTER DELETE ON todo BEGIN "
+        "DELETE FROM todo_fts WHERE rowid = old.id; END",
+    'item_fts_insert': "AFTER INSERT ON item BEGIN "
+        "UPDATE todo_fts SET items = coalesce(items || ' ', '') || new.content "
+        "WHERE rowid = new.todo_id; END",
+    'item_fts_update': "AFTER UPDATE OF content ON item BEGIN "
+        "DELETE FROM todo_fts WHERE rowid = new.todo_id;"
+        + TODO_FTS_DOCUMENT.format(todo_id="new.todo_id") + "END",
+    'item_fts_delete': "AFTER DELETE ON item BEGIN "
+        "DELETE FROM todo_fts WHERE rowid = old.todo_id;"
+        + TODO_FTS_DOCUMENT.format(todo_id="old.todo_id") + "END",
+    'review_fts_insert': "AFTER INSERT ON review BEGIN "
+        "INSERT INTO review_fts (rowid, title, content) "
+        "VALUES (new.id, new.title, new.content); END",
+    'review_fts_update': "AFTER UPDATE OF title, content ON review BEGIN "
+        "INSERT INTO review_fts (review_fts, rowid, title, content) "
+        "VALUES ('delete', old.id, old.title, old.content); "
+        "INSERT INTO review_fts (rowid, title, content) "
+        "VALUES (new.id, new.title, new.content); END",
+    'review_fts_delete': "AFTER DELETE ON review BEGIN "
+        "INSERT INTO review_fts (review_fts, rowid, title, content) "
+        "VALUES ('delete', old.id, old.title, old.content); END",
+}
+
+
+def upgrade():
+    op.execute(
+        "CREATE VIRTUAL TABLE todo_fts USING fts5("
+        "title, items, tokenize = 'porter unicode61 remove_diacritics 2')"
+    )
+    op.execute(
+        "CREATE VIRTUAL TABLE review_fts USING fts5("
+        "title, content, content = 'review', content_rowid = 'id', "
+        "tokenize = 'porter unicode61 remove_diacritics 2')"
+    )
+    for name, body in TRIGGERS.items():
+        op.execute(f"CREATE TRIGGER {name} {body}")
+
+    # index the existing todos, items and reviews
+    op.execute(TODO_FTS_DOCUMENT.replace("WHERE todo.id = {todo_id}", ""))
+    op.execute("INSERT INTO review_fts (review_fts) VALUES ('rebuild')")
+
+
+def downgrade():
+    for name in TRIGGERS:
+        op.execute(f"DROP TRIGGER {name}")
+    op.execute("DROP TABLE review_fts")
+    op.execute("DROP TABLE todo_fts")
@@ -0,0 +1,34 @@
+"""query indexes
+
+Revision ID: 9c3f5d12e7a4
+Revises: 4b7e2c91a0f3
+Create Date: 2026-10-17 03:31:08.552917
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9c3f5d12e7a4'
+down_revision = '4b7e2c91a0f3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_todo_user_id_public', 'todo', ['user_id', 'public'], unique=False)
+    op.create_index('ix_todo_public', 'todo', ['public'], unique=False)
+    op.create_index('ix_todo_best', 'todo', ['public', sa.text('avg_stars DESC'), 'id'], unique=False)
+    op.create_index('ix_item_todo_id', 'item', ['todo_id'], unique=False)
+    op.create_index('ix_review_todo_id', 'review', ['todo_id'], unique=False)
+    op.create_index('ix_review_user_id_todo_id', 'review', ['user_id', 'todo_id'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_review_user_id_todo_id', table_name='review')
+    op.drop_index('ix_review_todo_id', table_name='review')
+    op.drop_index('ix_item_todo_id', table_name='item')
+    op.drop_index('ix_todo_best', table_name='todo')
+    op.drop_index('ix_todo_public', table_name='todo')
+    op.drop_index('ix_todo_user_id_public', table_name='todo')
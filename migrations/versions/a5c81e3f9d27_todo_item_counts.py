@@ -0,0 +1,44 @@
+"""todo item counts
+
+Revision ID: a5c81e3f9d27
+Revises: 7d2a9c4e1b36
+Create Date: 2026-10-17 04:31:46.820913
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a5c81e3f9d27'
+down_revision = '7d2a9c4e1b36'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('todo') as batch_op:
+        batch_op.add_column(sa.Column('item_count', sa.Integer(), server_default='0', nullable=False))
+        batch_op.add_column(sa.Column('completed_count', sa.Integer(), server_default='0', nullable=False))
+
+    # backfill the counts of existing todos
+    op.execute(
+        """
+        UPDATE todo SET
+            item_count = (
+                SELECT count(item.id) FROM item
+                WHERE item.todo_id = todo.id
+            ),
+            completed_count = (
+                SELECT count(item.id) FROM item
+                WHERE item.todo_id = todo.id AND item.completed = 1
+            )
+        """
+    )
+
+
+def downgrade():
+    # native DROP COLUMN (SQLite 3.35+), a batch copy of todo
+    # would be rejected by the full text search triggers
+    op.drop_column('todo', 'completed_count')
+    op.drop_column('todo', 'item_count')
@@ -0,0 +1,34 @@
+"""widen password hash
+
+Revision ID: c27e94a1f05b
+Revises: 3f6b0d8e52c1
+Create Date: 2026-10-17 05:14:40.552816
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c27e94a1f05b'
+down_revision = '3f6b0d8e52c1'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('user') as batch_op:
+        batch_op.alter_column(
+            'password',
+            existing_type=sa.String(length=100),
+            type_=sa.String(length=255)
+        )
+
+
+def downgrade():
+    with op.batch_alter_table('user') as batch_op:
+        batch_op.alter_column(
+            'password',
+            existing_type=sa.String(length=255),
+            type_=sa.String(length=100)
+        )
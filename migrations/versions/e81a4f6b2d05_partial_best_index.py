@@ -0,0 +1,29 @@
+"""partial best index
+
+Revision ID: e81a4f6b2d05
+Revises: 9c3f5d12e7a4
+Create Date: 2026-10-17 03:52:31.604118
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e81a4f6b2d05'
+down_revision = '9c3f5d12e7a4'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.drop_index('ix_todo_best', table_name='todo')
+    op.create_index(
+        'ix_todo_best', 'todo', ['public', sa.text('avg_stars DESC'), 'id'], unique=False,
+        sqlite_where=sa.text('public = 1 AND avg_stars IS NOT NULL')
+    )
+
+
+def downgrade():
+    op.drop_index('ix_todo_best', table_name='todo')
+    op.create_index('ix_todo_best', 'todo', ['public', sa.text('avg_stars DESC'), 'id'], unique=False)
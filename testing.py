@@ -1,4 +1,4 @@
-import requests, random, string, json
+import requests, random, string, json, threading, base64
 
 global bearer, refresh
 
@@ -13,6 +13,28 @@ def string_gen(n):
         )
     )
 
+def run_concurrently(*requests_calls):
+    """
+    Start the calls at once, returns the responses
+    """
+
+    barrier = threading.Barrier(len(requests_calls))
+    responses = [None] * len(requests_calls)
+
+    def run(i, call):
+        barrier.wait()
+        responses[i] = call()
+
+    threads = [
+        threading.Thread(target=run, args=(i, call))
+        for i, call in enumerate(requests_calls)
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return responses
+
 class User:
     def __init__(self, username, password) -> None:
         self.id = None
@@ -157,3 +179,241 @@ def test_create_reviews():
                 assert response.status_code == 201, response.json()
                 response_data = response.json()
                 log(log_file, f"{response_data}")
+
+def test_paginate_todos(limit=50):
+    seen = list()
+    cursor = None
+    while True:
+        params = {"limit": limit}
+        if cursor:
+            params["cursor"] = cursor
+        response = requests.get(
+            url=server_url + "todos",
+            params=params
+        )
+        assert response.status_code == 200, response.json()
+        response_data = response.json()
+        seen.extend(t["id"] for t in response_data)
+        cursor = response.headers.get("X-Next-Cursor")
+        if not cursor:
+            break
+    assert seen == sorted(set(seen))
+    log(log_file, f"paginated {len(seen)} todos")
+
+def test_create_items_batch(n=50):
+    for user in test_users:
+        for todo in test_todos:
+            if todo.user_id == user.id:
+                response = requests.post(
+                    url=server_url + f"todos/{todo.id}/items/batch",
+                    headers={
+                        "content-type": "application/json",
+                        "Authorization": f"Bearer {user.bearer}"
+                    },
+                    data=json.dumps(
+                        {
+                            "items": [
+                                {
+                                    "content": f"new batch item",
+                                    "completed": random.randrange(2)
+                                }
+                                for _ in range(n)
+                            ]
+                        }
+                    )
+                )
+                assert response.status_code == 201, response.json()
+                response_data = response.json()
+                assert len(response_data) == n
+                log(log_file, f"{response_data}")
+
+def test_update_items_bulk():
+    for user in test_users:
+        for todo in test_todos:
+            if todo.user_id == user.id:
+                response = requests.patch(
+                    url=server_url + f"todos/{todo.id}/items",
+                    headers={
+                        "content-type": "application/json",
+                        "Authorization": f"Bearer {user.bearer}"
+                    },
+                    data=json.dumps(
+                        {
+                            "filter": {"completed": False},
+                            "set": {"completed": True}
+                        }
+                    )
+                )
+                assert response.status_code == 200, response.json()
+                response_data = response.json()
+                log(log_file, f"{response_data}")
+                response = requests.get(
+                    url=server_url + f"todos/{todo.id}",
+                    headers={
+                        "Authorization": f"Bearer {user.bearer}"
+                    }
+                )
+                assert response.status_code == 200, response.json()
+                progress = response.json()["progress"]
+                assert progress["completed"] == progress["items"], progress
+
+def test_delete_items_bulk():
+    for user in test_users:
+        for todo in test_todos:
+            if todo.user_id == user.id:
+                response = requests.delete(
+                    url=server_url + f"todos/{todo.id}/items",
+                    headers={
+                        "content-type": "application/json",
+                        "Authorization": f"Bearer {user.bearer}"
+                    },
+                    data=json.dumps(
+                        {
+                            "filter": {"completed": True}
+                        }
+                    )
+                )
+                assert response.status_code == 200, response.json()
+                response_data = response.json()
+                log(log_file, f"{response_data}")
+                response = requests.get(
+                    url=server_url + f"todos/{todo.id}",
+                    headers={
+                        "Authorization": f"Bearer {user.bearer}"
+                    }
+                )
+                assert response.status_code == 200, response.json()
+                progress = response.json()["progress"]
+                assert progress["items"] == 0, progress
+
+def test_concurrent_item_writes(n=2):
+    user = test_users[0]
+    todo = next(t for t in test_todos if t.user_id == user.id)
+    headers = {
+        "content-type": "application/json",
+        "Authorization": f"Bearer {user.bearer}"
+    }
+    response = requests.post(
+        url=server_url + f"todos/{todo.id}/items/batch",
+        headers=headers,
+        data=json.dumps(
+            {
+                "items": [
+                    {"content": "concurrent item", "completed": False}
+                    for _ in range(2)
+                ]
+            }
+        )
+    )
+    assert response.status_code == 201, response.json()
+    toggled, deleted = response.json()
+    toggle = lambda: requests.patch(
+        url=server_url + f"todos/{todo.id}/items/{toggled['id']}",
+        headers=headers,
+        data=json.dumps({"content": "toggled item", "completed": True})
+    )
+    delete = lambda: requests.delete(
+        url=server_url + f"todos/{todo.id}/items/{deleted['id']}",
+        headers=headers
+    )
+    responses = run_concurrently(*[toggle, delete] * n)
+    assert sorted(r.status_code for r in responses) == [200] * (n + 1) + [404] * (n - 1)
+    response = requests.get(
+        url=server_url + f"todos/{todo.id}/items",
+        headers=headers
+    )
+    assert response.status_code == 200, response.json()
+    items = response.json()
+    response = requests.get(
+        url=server_url + f"todos/{todo.id}",
+        headers=headers
+    )
+    assert response.status_code == 200, response.json()
+    progress = response.json()["progress"]
+    assert progress["items"] == len(items), progress
+    assert progress["completed"] == len([i for i in items if i["completed"]]), progress
+    log(log_file, f"{progress}")
+
+def test_concurrent_review_writes(n=2):
+    owner, patcher, deleter = test_users[:3]
+    todo = requests.post(
+        url=server_url + "todos",
+        headers={
+            "content-type": "application/json",
+            "Authorization": f"Bearer {owner.bearer}"
+        },
+        data=json.dumps({"title": "concurrent reviews", "public": True})
+    ).json()
+    reviews = dict()
+    for user in (patcher, deleter):
+        response = requests.post(
+            url=server_url + f"todos/{todo['id']}/reviews",
+            headers={
+                "content-type": "application/json",
+                "Authorization": f"Bearer {user.bearer}"
+            },
+            data=json.dumps(
+                {
+                    "title": "concurrent review",
+                    "content": "concurrent review content",
+                    "stars": 5
+                }
+            )
+        )
+        assert response.status_code == 201, response.json()
+        reviews[user.id] = response.json()["id"]
+    patch = lambda stars: lambda: requests.patch(
+        url=server_url + f"reviews/{reviews[patcher.id]}",
+        headers={
+            "content-type": "application/json",
+            "Authorization": f"Bearer {patcher.bearer}"
+        },
+        data=json.dumps(
+            {
+                "title": "concurrent review",
+                "content": "concurrent review content",
+                "stars": stars
+            }
+        )
+    )
+    delete = lambda: requests.delete(
+        url=server_url + f"reviews/{reviews[deleter.id]}",
+        headers={"Authorization": f"Bearer {deleter.bearer}"}
+    )
+    responses = run_concurrently(
+        *[patch(1 + 2 * (i % 2)) for i in range(n)], *[delete] * n
+    )
+    assert sorted(r.status_code for r in responses) == [200] * (n + 1) + [404] * (n - 1)
+    response = requests.get(url=server_url + f"todos/{todo['id']}/reviews")
+    assert response.status_code == 200, response.json()
+    stars = [r["stars"] for r in response.json()]
+    response = requests.get(url=server_url + f"todos/{todo['id']}")
+    assert response.status_code == 200, response.json()
+    todo = response.json()
+    assert todo["votes"] == len(stars), todo
+    assert todo["avg_rating"] == sum(stars) / len(stars), todo
+    log(log_file, f"{todo}")
+
+def test_invalid_cursors():
+    cursor = lambda key: base64.urlsafe_b64encode(
+        json.dumps(key).encode()
+    ).decode().rstrip("=")
+    for key in ([10**30], [-2**63 - 1], [1e400], [True]):
+        response = requests.get(
+            url=server_url + "todos",
+            params={"cursor": cursor(key)}
+        )
+        assert response.status_code == 400, response.json()
+        assert response.json()["errors"] == {"cursor": "invalid cursor"}
+    for url, key in (("todos", [1, 2]), ("todos/best", [1]), ("reviews", [4.5, 1])):
+        response = requests.get(
+            url=server_url + url,
+            params={"cursor": cursor(key)}
+        )
+        assert response.status_code == 400, response.json()
+    for url, key in (("todos", [2**63 - 1]), ("todos/best", [4.5, 1])):
+        response = requests.get(
+            url=server_url + url,
+            params={"cursor": cursor(key)}
+        )
+        assert response.status_code == 200, response.json()